@@ -0,0 +1,116 @@
+import os
+import numpy as np
+import pandas as pd
+from read_data import derived
+from common.sqlstore import sql_backend_enabled
+
+def sketches_enabled():
+    return os.environ.get('DASHBOARD_SKETCHES', '0') == '1'
+
+# Number of fixed-width bins used by the salary and age histograms
+NBINS = 20
+
+def histogram(values, nbins=NBINS):
+    """Fixed-edge histogram of the non-missing values: (edges, counts)"""
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.zeros(nbins + 1), np.zeros(nbins, dtype='int64')
+    low, high = values.min(), values.max()
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, nbins + 1)
+    counts, _ = np.histogram(values, bins=edges)
+    return edges, counts
+
+def box_stats(codes, values, groups):
+    """
+    Box-plot statistics for each group in one sort over (group, value).
+
+    Quartiles use linear interpolation and the fences are the most extreme
+    values within 1.5 IQR of the box, the same rules Plotly applies to raw
+    data. Returns a DataFrame indexed by group plus the outliers per group.
+    """
+    valid = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    order = np.lexsort((values, codes))
+    values = values[order]
+
+    sizes = np.bincount(codes, minlength=len(groups))
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    present = sizes > 0
+
+    # Linearly interpolated quantiles for all groups at once
+    quantiles = {}
+    for name, q in (('q1', 0.25), ('median', 0.5), ('q3', 0.75)):
+        pos = q * (sizes[present] - 1)
+        lo = np.floor(pos).astype('int64')
+        hi = np.minimum(lo + 1, sizes[present] - 1)
+        frac = pos - lo
+        base = starts[present]
+        quantiles[name] = values[base + lo] + frac * (values[base + hi] - values[base + lo])
+
+    stats = pd.DataFrame(quantiles, index=pd.Index(np.asarray(groups)[present], name='group'))
+    iqr = stats['q3'] - stats['q1']
+    lower_limit = (stats['q1'] - 1.5 * iqr).to_numpy()
+    upper_limit = (stats['q3'] + 1.5 * iqr).to_numpy()
+
+    # Each group is a sorted slice, so fences and outliers are binary searches
+    lowerfence, upperfence, outliers = [], [], []
+    for i, (start, size) in enumerate(zip(starts[present], sizes[present])):
+        group_values = values[start:start + size]
+        lo = np.searchsorted(group_values, lower_limit[i], side='left')
+        hi = np.searchsorted(group_values, upper_limit[i], side='right')
+        lowerfence.append(group_values[lo])
+        upperfence.append(group_values[hi - 1])
+        outliers.append(np.concatenate((group_values[:lo], group_values[hi:])))
+
+    stats['lowerfence'] = lowerfence
+    stats['upperfence'] = upperfence
+    stats['count'] = sizes[present]
+    return stats, outliers
+
+def compute_aggregates(df, nbins=NBINS):
+    """
+    Compute everything the employee charts need in a single pass.
+
+    Returns a dict with the department counts, the salary and age
+    histograms and per-department box statistics for salary and age.
+    """
+    departments = df['Department'].astype('category')
+    codes = departments.cat.codes.to_numpy()
+    groups = list(departments.cat.categories)
+
+    salary = df['Salary_SEK'].to_numpy(dtype='float64')
+    age = df['Age'].to_numpy(dtype='float64')
+
+    counts = np.bincount(codes[codes >= 0], minlength=len(groups))
+    dept_counts = pd.DataFrame({'Department': groups, 'Count': counts})
+    dept_counts = dept_counts[dept_counts['Count'] > 0]
+    dept_counts = dept_counts.sort_values('Count', ascending=False, kind='stable')
+
+    return {
+        'departments': groups,
+        'dept_counts': dept_counts.reset_index(drop=True),
+        'salary_hist': histogram(salary, nbins),
+        'age_hist': histogram(age, nbins),
+        'salary_box': box_stats(codes, salary, groups),
+        'age_box': box_stats(codes, age, groups),
+    }
+
+def get_aggregates():
+    """Aggregates for the current data, recomputed only when the CSV changes"""
+    if sketches_enabled():
+        # Drawn from per-department sketches merged over every source file
+        from distribution_sketches import get_sketch_aggregates
+        return get_sketch_aggregates()
+    if sql_backend_enabled():
+        # Computed inside the database, the frame is never loaded
+        from sql_backend import get_aggregates as get_sql_aggregates
+        return get_sql_aggregates()
+    return derived(compute_aggregates)
+
+if __name__ == '__main__':
+    aggregates = get_aggregates()
+    print(aggregates['dept_counts'])
+    print(aggregates['salary_box'][0])
+    print(aggregates['age_box'][0])
@@ -1,119 +1,157 @@
-from read_data import read_data
+from aggregates import get_aggregates
 import streamlit as st
-import pandas as pd
+import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
+from common.downsample import MAX_POINTS, use_webgl, sample_extremes, annotate_reduction
+from common.figure_payload import compact_figure
 
-def employees_by_department_bar():
-    
-    # Load data from CSV file
-    df = read_data()
-    # Count employees in each department and prepare data for chart
-    dept_counts = df['Department'].value_counts().reset_index()
-    dept_counts.columns = ['Department', 'Count']
-    # Create bar chart using Plotly Express
-    fig = px.bar(
-        dept_counts,
-        x='Department',
-        y='Count',
-        text='Count',
-        title="Number of employees per department",
-        color='Department'
-    )
+# One color per department, shared by all department charts
+COLORS = px.colors.qualitative.Plotly
+
+def department_colors(departments):
+    return {dept: COLORS[i % len(COLORS)] for i, dept in enumerate(departments)}
+
+def employees_by_department_figure(aggregates):
+    # Department counts are precomputed, one bar per department
+    dept_counts = aggregates['dept_counts']
+    colors = department_colors(aggregates['departments'])
+    fig = go.Figure(go.Bar(
+        x=dept_counts['Department'],
+        y=dept_counts['Count'],
+        text=dept_counts['Count'],
+        marker_color=[colors[dept] for dept in dept_counts['Department']]
+    ))
     # Customize chart appearance
     fig.update_layout(
+        title="Number of employees per department",
         xaxis_title="Department",
         yaxis_title="Number of employees",
         showlegend=False # Hide redundant legend
     )
+    return compact_figure(fig)
+
+def histogram_figure(edges, counts, title, xaxis_title):
+    # Draw the precomputed bins as touching bars
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=edges[1:] - edges[:-1],
+        marker_color='#1E3A8A'
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title=xaxis_title,
+        yaxis_title="Number of employees",
+        bargap=0
+    )
+    return compact_figure(fig)
+
+def limit_outliers(outliers, max_points=MAX_POINTS):
+    """Sample each department's outliers down to its share of max_points, keeping the extremes"""
+    total = sum(len(points) for points in outliers)
+    if total <= max_points:
+        return outliers, total, total
+    limited = [
+        points[sample_extremes(points, int(np.ceil(max_points * len(points) / total)), seed=i)]
+        for i, points in enumerate(outliers)
+    ]
+    return limited, sum(len(points) for points in limited), total
+
+def boxplot_figure(box, departments, title, yaxis_title):
+    # Boxes are drawn from quartiles and fences, only outliers are sent as points
+    stats, outliers = box
+    outliers, shown, total = limit_outliers(outliers)
+    # Many outlier points are drawn as one WebGL scatter instead of SVG box points
+    webgl = use_webgl(shown)
+    colors = department_colors(departments)
+    fig = go.Figure()
+    for (dept, row), points in zip(stats.iterrows(), outliers):
+        fig.add_trace(go.Box(
+            name=dept,
+            x=[dept],
+            y=[points[:0] if webgl else points],
+            q1=[row['q1']],
+            median=[row['median']],
+            q3=[row['q3']],
+            lowerfence=[row['lowerfence']],
+            upperfence=[row['upperfence']],
+            boxpoints='outliers',
+            marker_color=colors[dept]
+        ))
+        if webgl and len(points):
+            fig.add_trace(go.Scattergl(
+                x=np.full(len(points), dept, dtype=object),
+                y=points,
+                mode='markers',
+                marker={'color': colors[dept], 'size': 4},
+                name=dept
+            ))
+    fig.update_layout(
+        title=title,
+        xaxis_title="Department",
+        yaxis_title=yaxis_title,
+        showlegend=False
+    )
+    return compact_figure(annotate_reduction(fig, shown, total))
+
+def employees_by_department_bar():
+
+    # Load precomputed aggregates (cached until the CSV changes)
+    aggregates = get_aggregates()
+    fig = employees_by_department_figure(aggregates)
     # Display the chart in Streamlit with responsive width
     st.plotly_chart(fig, use_container_width=True)
 
 def salary_distribution_histogram():
-    
-    df = read_data()
+
+    edges, counts = get_aggregates()['salary_hist']
     # Create histogram of salary distribution
-    fig = px.histogram(
-        df, 
-        x='Salary_SEK',
-        nbins=20,
-        title="Salary distribution",
-        color_discrete_sequence=['#1E3A8A']
-    )
-    # Customize chart appearance
-    fig.update_layout(
-        xaxis_title="Salary (SEK)",
-        yaxis_title="Number of employees" 
-    )
-    
+    fig = histogram_figure(edges, counts, "Salary distribution", "Salary (SEK)")
+
     st.plotly_chart(fig, use_container_width=True)
-    
+
 def salary_by_department_boxplot():
-    
-    df = read_data()
+
+    aggregates = get_aggregates()
     # Create box plot comparing salaries across departments
-    fig = px.box(
-        df,
-        x='Department',
-        y='Salary_SEK',
-        color='Department',
-        title="Salaries per department"
-        )
-    
-    fig.update_layout(
-        xaxis_title="Department",
-        yaxis_title="Salary (SEK)",
-        showlegend=False
+    fig = boxplot_figure(
+        aggregates['salary_box'],
+        aggregates['departments'],
+        "Salaries per department",
+        "Salary (SEK)"
     )
 
     st.plotly_chart(fig, use_container_width=True)
 
 def age_distribution_histogram():
-    
-    df = read_data()
-    
-    fig = px.histogram(
-        df,
-        x='Age',
-        nbins=20,
-        title="Age distribution",
-        color_discrete_sequence=['#1E3A8A']
-    )
-    
-    fig.update_layout(
-        xaxis_title="Age",
-        yaxis_title="Number of employees",
-    )
-    
+
+    edges, counts = get_aggregates()['age_hist']
+
+    fig = histogram_figure(edges, counts, "Age distribution", "Age")
+
     st.plotly_chart(fig, use_container_width=True)
-    
+
 def age_by_department_boxplot():
-    
-    df = read_data()
-    
-    fig = px.box(
-        df,
-        x='Department',
-        y='Age',
-        color='Department',
-        title="Age per department",
-    )
-    
-    fig.update_layout(
-        xaxis_title="Department",
-        yaxis_title="Age",
-        showlegend=False
+
+    aggregates = get_aggregates()
+
+    fig = boxplot_figure(
+        aggregates['age_box'],
+        aggregates['departments'],
+        "Age per department",
+        "Age"
     )
-    
+
     st.plotly_chart(fig, use_container_width=True)
 
 # Code to test charts independently. Use: streamlit run charts.py
 if __name__ == '__main__':
     import streamlit as st
-        
+
     st.title("Test of diagram")
     employees_by_department_bar()
     salary_distribution_histogram()
     salary_by_department_boxplot()
     age_distribution_histogram()
     age_by_department_boxplot()
-    
\ No newline at end of file
@@ -1,8 +1,9 @@
 import streamlit as st
-import pandas as pd
 from pathlib import Path
-from read_data import read_data
-from kpis import total_employees, average_age, average_salary
+from read_data import DATA_FILE, read_data, data_caption
+from kpis import company_kpis
+from employee_table import employee_details_table
+from salary_index import salary_lookup
 from charts import (
     employees_by_department_bar,
     salary_distribution_histogram,
@@ -10,6 +11,9 @@ from charts import (
     age_distribution_histogram,
     age_by_department_boxplot
 )
+from common.pages import load_css, load_data
+from common.profiler import RerunProfiler
+from common.sqlstore import sql_backend_enabled
 
 # --- Page configuration ---
 st.set_page_config(
@@ -19,39 +23,41 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# CSS loading function
-def load_css():
-    css_path = Path(__file__).parent / "style" / "style.css"
-    st.write(f"Looking for CSS at: {css_path}")
-    if css_path.exists():
-        with open(css_path, "r") as f:
-            st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
-    else:
-        st.warning("style.css not found. Please check the path.")
+# Timing spans for this rerun (only recorded when profiling is enabled)
+profiler = RerunProfiler("executive_dashboard")
+
+# Load the CSS, the file is only read again when it changes
+with profiler.span("css load"):
+    load_css(Path(__file__).parent / "style" / "styles.css")
 
 # --- Load data ---
-try:
-    df = read_data()
-    
-    if df.empty:
-        st.error("No data found. Please check the CSV file.")
-        st.stop()
-        
-except Exception as e:
-    st.error(f"An error occurred when loading data: {e}")
-    st.info("Please check that the file 'supahcoolsoft.csv' exists in the 'data' folder.")
-    st.stop()
+with profiler.span("data load"):
+    if sql_backend_enabled():
+        # The rows stay in the database, only check that there are some
+        from sql_backend import row_count
+        load_data(row_count, DATA_FILE.name, is_empty=lambda rows: rows == 0)
+    else:
+        load_data(read_data, DATA_FILE.name)
 
 # --- Dashboard components ---
 # Title
 st.title("Executive Dashboard")
 st.markdown("### Supahcoolsoft Employee Overview")
+if not sql_backend_enabled():
+    # A newer file is loaded in the background, this version is served meanwhile
+    st.caption(data_caption())
 st.markdown("---")
 
 # KPI components for all employees
 st.markdown("## Company-wide Statistics")
+with profiler.span("kpis"):
+    company = company_kpis()
 labels = ("Total Employees", "Average Age", "Average Salary")
-kpis = (total_employees, f"{average_age:.1f} years", f"{average_salary:,.0f} SEK")
+kpis = (
+    company['total_employees'],
+    f"{company['average_age']:.1f} years",
+    f"{company['average_salary']:,.0f} SEK"
+)
 cols = st.columns(3)
 
 for col, label, kpi in zip(cols, labels, kpis):
@@ -60,16 +66,30 @@ for col, label, kpi in zip(cols, labels, kpis):
 
 # Show an expandable table with employee details
 with st.expander("Show Employee Details", expanded=False):
-    st.dataframe(df, hide_index=True)
+    with profiler.span("employee details"):
+        employee_details_table()
 
 # Chart components
 st.markdown("## Department Statistics")
-employees_by_department_bar()
+with profiler.span("employees_by_department_bar"):
+    employees_by_department_bar()
 
 st.markdown("## Salary Analysis")
-salary_distribution_histogram()
-salary_by_department_boxplot()
+with profiler.span("salary_distribution_histogram"):
+    salary_distribution_histogram()
+with profiler.span("salary_by_department_boxplot"):
+    salary_by_department_boxplot()
+
+# Where one employee sits within the company, department or position
+st.markdown("## Salary Lookup")
+with profiler.span("salary_lookup"):
+    salary_lookup()
 
 st.markdown("## Age Analysis")
-age_distribution_histogram()
-age_by_department_boxplot()
+with profiler.span("age_distribution_histogram"):
+    age_distribution_histogram()
+with profiler.span("age_by_department_boxplot"):
+    age_by_department_boxplot()
+
+profiler.finish()
+
@@ -0,0 +1,203 @@
+"""
+Salary and age distributions per department from mergeable sketches.
+
+With DASHBOARD_SKETCHES=1 the histograms and box plots are drawn from one
+KLL quantile sketch and one fixed-bin histogram per department and column
+instead of sorting every row. Every source file (the dashboard CSV plus any
+monthly shard in data/history/) is read once in chunks, its sketches are
+saved next to it as <file>.sketch.npz and rebuilt only when the file's
+mtime or size changes, and the per-file sketches are merged.
+
+Error bounds (see common/sketches.py): quartiles and fences are within
+about 1.7% of the department's rows in rank; a histogram value can move to
+the neighbouring bar only within one fine bin width (HISTOGRAM_WIDTHS) of
+the bar edge. Outliers are the retained sketch items beyond the fences, a
+sample of the real outliers. With few enough rows per department the
+quantile sketches hold every value and the box plots are exact.
+"""
+import os
+import json
+import threading
+import numpy as np
+import pandas as pd
+from read_data import DATA_FILE, file_version, NUMERIC_COLUMNS
+from aggregates import NBINS
+from common.sketches import KllSketch, FixedHistogram
+
+HISTORY_DIR = DATA_FILE.parent / "history"
+CHUNK_ROWS = 500_000
+# Fine histogram bin width per column, in the column's unit
+HISTOGRAM_WIDTHS = {'Salary_SEK': 50.0, 'Age': 1.0}
+# Rows without a department still count towards the histograms
+NO_DEPARTMENT = ''
+
+# Merged sketches shared by every session: (versions, aggregates)
+_cache = {}
+_lock = threading.Lock()
+
+def source_files():
+    return [DATA_FILE] + sorted(HISTORY_DIR.glob('*.csv'))
+
+class FileSketches:
+    """Quantile sketch and histogram for every (department, column) of one or more files"""
+
+    def __init__(self):
+        self.rows = {}
+        self.quantiles = {}
+        self.histograms = {}
+
+    def _get(self, department, column):
+        key = (department, column)
+        if key not in self.quantiles:
+            self.quantiles[key] = KllSketch()
+            self.histograms[key] = FixedHistogram(HISTOGRAM_WIDTHS[column])
+        return self.quantiles[key], self.histograms[key]
+
+    def update(self, chunk):
+        departments = chunk['Department'].fillna(NO_DEPARTMENT).astype(str)
+        for department, rows in chunk.groupby(departments, sort=False):
+            self.rows[department] = self.rows.get(department, 0) + len(rows)
+            for column in NUMERIC_COLUMNS:
+                values = pd.to_numeric(rows[column], errors='coerce').to_numpy('float64')
+                quantiles, histogram = self._get(department, column)
+                quantiles.update(values)
+                histogram.update(values)
+
+    def merge(self, other):
+        for department, count in other.rows.items():
+            self.rows[department] = self.rows.get(department, 0) + count
+        for (department, column), sketch in other.quantiles.items():
+            quantiles, histogram = self._get(department, column)
+            quantiles.merge(sketch)
+            histogram.merge(other.histograms[(department, column)])
+        return self
+
+    def departments(self):
+        return sorted(set(self.rows) - {NO_DEPARTMENT})
+
+    def save(self, path, version):
+        arrays, keys = {}, []
+        for i, (key, sketch) in enumerate(self.quantiles.items()):
+            keys.append(list(key))
+            for name, array in sketch.to_arrays().items():
+                arrays[f'{i}.kll.{name}'] = array
+            for name, array in self.histograms[key].to_arrays().items():
+                arrays[f'{i}.hist.{name}'] = array
+        meta = {'version': list(version), 'rows': self.rows, 'keys': keys}
+        arrays['meta'] = np.array(json.dumps(meta))
+        # Saved under a temporary name and renamed, readers never see half a file
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp.npz')
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, version):
+        """Sketches saved for this file version, or None"""
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if tuple(meta['version']) != tuple(version):
+                return None
+            sketches = cls()
+            sketches.rows = meta['rows']
+            for i, key in enumerate(meta['keys']):
+                key = tuple(key)
+                sketches.quantiles[key] = KllSketch.from_arrays(
+                    {name: data[f'{i}.kll.{name}'] for name in ('items', 'level_sizes', 'stats')}
+                )
+                sketches.histograms[key] = FixedHistogram.from_arrays(
+                    {name: data[f'{i}.hist.{name}'] for name in ('bins', 'counts', 'width')}
+                )
+        return sketches
+
+def sketch_path(path):
+    return path.with_name(path.name + '.sketch.npz')
+
+def file_sketches(path):
+    """Sketches of one CSV, from its saved file or a chunked pass over it"""
+    version = file_version(path)
+    sketches = FileSketches.load(sketch_path(path), version)
+    if sketches is None:
+        sketches = FileSketches()
+        for chunk in pd.read_csv(path, usecols=['Department'] + NUMERIC_COLUMNS, chunksize=CHUNK_ROWS):
+            sketches.update(chunk)
+        sketches.save(sketch_path(path), version)
+    return sketches
+
+def histogram(sketches, column, nbins=NBINS):
+    """(edges, counts) over every department, edges as in aggregates.histogram"""
+    merged_hist, merged_kll = FixedHistogram(HISTOGRAM_WIDTHS[column]), KllSketch()
+    for key, sketch in sketches.quantiles.items():
+        if key[1] == column:
+            merged_kll.merge(sketch)
+            merged_hist.merge(sketches.histograms[key])
+    if merged_kll.n == 0:
+        return np.zeros(nbins + 1), np.zeros(nbins, dtype='int64')
+    low, high = merged_kll.min, merged_kll.max
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, nbins + 1)
+    return edges, merged_hist.histogram(edges, merged_kll.min, merged_kll.max)
+
+def box_stats(sketches, column, departments):
+    """Box statistics and outliers in the format of aggregates.box_stats"""
+    rows, outliers = [], []
+    present = []
+    for department in departments:
+        sketch = sketches.quantiles.get((department, column))
+        if sketch is None or sketch.n == 0:
+            continue
+        q1, median, q3 = sketch.quantiles([0.25, 0.5, 0.75])
+        low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+        values, _ = sketch.items()
+        inside = values[(values >= low) & (values <= high)]
+        # The exact extremes stand in for the fence when they are inside it
+        lowerfence = sketch.min if sketch.min >= low else (inside.min() if len(inside) else q1)
+        upperfence = sketch.max if sketch.max <= high else (inside.max() if len(inside) else q3)
+        outside = values[(values < low) | (values > high)]
+        # The exact extremes are always shown, even if compaction dropped them
+        extremes = [v for v in {sketch.min, sketch.max} if (v < low or v > high) and v not in outside]
+        outside = np.sort(np.concatenate((outside, extremes)))
+        present.append(department)
+        rows.append((q1, median, q3, lowerfence, upperfence, sketch.n))
+        outliers.append(outside)
+    stats = pd.DataFrame(
+        rows, columns=['q1', 'median', 'q3', 'lowerfence', 'upperfence', 'count'],
+        index=pd.Index(present, name='group')
+    )
+    return stats, outliers
+
+def sketch_aggregates(sketches, nbins=NBINS):
+    """The aggregates.compute_aggregates dict, drawn from merged sketches"""
+    departments = sketches.departments()
+    counts = [sketches.rows[department] for department in departments]
+    dept_counts = pd.DataFrame({'Department': departments, 'Count': counts})
+    dept_counts = dept_counts[dept_counts['Count'] > 0]
+    dept_counts = dept_counts.sort_values('Count', ascending=False, kind='stable')
+    return {
+        'departments': departments,
+        'dept_counts': dept_counts.reset_index(drop=True),
+        'salary_hist': histogram(sketches, 'Salary_SEK', nbins),
+        'age_hist': histogram(sketches, 'Age', nbins),
+        'salary_box': box_stats(sketches, 'Salary_SEK', departments),
+        'age_box': box_stats(sketches, 'Age', departments),
+    }
+
+def get_sketch_aggregates():
+    """Aggregates over every source file, recomputed only when one of them changes"""
+    paths = source_files()
+    versions = tuple((str(path), file_version(path)) for path in paths)
+    with _lock:
+        if _cache.get('versions') != versions:
+            merged = FileSketches()
+            for path in paths:
+                merged.merge(file_sketches(path))
+            _cache['aggregates'] = sketch_aggregates(merged)
+            _cache['versions'] = versions
+        return _cache['aggregates']
+
+if __name__ == '__main__':
+    aggregates = get_sketch_aggregates()
+    print(aggregates['dept_counts'])
+    print(aggregates['salary_box'][0])
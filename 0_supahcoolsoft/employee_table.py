@@ -0,0 +1,153 @@
+import threading
+import numpy as np
+import pandas as pd
+import streamlit as st
+from read_data import derived
+from common.sqlstore import sql_backend_enabled
+
+# Contact details (Email, PhoneNumber) are never sent to the browser
+DISPLAY_COLUMNS = [
+    'EmployeeID', 'FirstName', 'LastName', 'Age',
+    'Department', 'Position', 'Salary_SEK'
+]
+SEARCH_FIELDS = {
+    'Name': ['FullName', 'FirstName', 'LastName'],
+    'EmployeeID': ['EmployeeID'],
+    'Department': ['Department'],
+    'Position': ['Position'],
+}
+PAGE_SIZE = 50
+
+class ColumnIndex:
+    """
+    Search index over one text column.
+
+    The distinct lower-cased values are kept sorted (prefix search is two
+    binary searches) and in a dict (exact lookups). Rows are grouped by value
+    so any contiguous run of values maps to one slice of row positions.
+    """
+
+    def __init__(self, values):
+        keys = pd.Series(values, dtype='object').fillna('').astype(str).str.lower()
+        codes, uniques = pd.factorize(keys, sort=True)
+        self.keys = np.asarray(uniques, dtype=object)
+        self.lookup = {key: code for code, key in enumerate(self.keys)}
+        self.rows = np.argsort(codes, kind='stable')
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(self.keys)))))
+
+    def exact(self, term):
+        code = self.lookup.get(term.lower())
+        if code is None:
+            return self.rows[:0]
+        return self.rows[self.offsets[code]:self.offsets[code + 1]]
+
+    def prefix(self, term):
+        term = term.lower()
+        lo = np.searchsorted(self.keys, term, side='left')
+        hi = np.searchsorted(self.keys, term + '\uffff', side='left')
+        return self.rows[self.offsets[lo]:self.offsets[hi]]
+
+    def substring(self, term):
+        # Scans the distinct values only, not every row
+        matches = pd.Series(self.keys).str.contains(term.lower(), regex=False).to_numpy()
+        codes = np.flatnonzero(matches)
+        if len(codes) == 0:
+            return self.rows[:0]
+        return np.concatenate([self.rows[self.offsets[c]:self.offsets[c + 1]] for c in codes])
+
+class EmployeeIndex:
+    """Prebuilt search and sort indexes used to serve the details table a page at a time"""
+
+    def __init__(self, df):
+        self.df = df[DISPLAY_COLUMNS].reset_index(drop=True)
+        full_names = df['FirstName'].fillna('') + ' ' + df['LastName'].fillna('')
+        self.columns = {'FullName': ColumnIndex(full_names.to_numpy())}
+        for fields in SEARCH_FIELDS.values():
+            for col in fields:
+                if col not in self.columns:
+                    self.columns[col] = ColumnIndex(df[col].to_numpy())
+        self.orders = {}
+        self.lock = threading.Lock()
+
+    def order(self, column, ascending=True):
+        """Row positions sorted by column (missing values last), built on first use"""
+        key = (column, ascending)
+        with self.lock:
+            if key not in self.orders:
+                ordered = self.df[column].sort_values(
+                    ascending=ascending, na_position='last', kind='stable'
+                )
+                order = ordered.index.to_numpy()
+                rank = np.empty(len(order), dtype='int64')
+                rank[order] = np.arange(len(order))
+                self.orders[key] = (order, rank)
+            return self.orders[key]
+
+    def search(self, term, field=None, mode='prefix'):
+        """Sorted row positions matching term in one field, or in all fields if field is None"""
+        fields = SEARCH_FIELDS[field] if field else [c for f in SEARCH_FIELDS.values() for c in f]
+        matches = []
+        for col in fields:
+            index = self.columns[col]
+            if mode == 'exact':
+                matches.append(index.exact(term))
+            elif mode == 'substring':
+                matches.append(index.substring(term))
+            else:
+                matches.append(index.prefix(term))
+        return np.unique(np.concatenate(matches))
+
+    def rows(self, term='', field=None, mode='prefix', sort_by='EmployeeID', ascending=True):
+        """Row positions matching the search, in display order"""
+        order, rank = self.order(sort_by, ascending)
+        if not term:
+            return order
+        rows = self.search(term, field, mode)
+        # Only the matching rows are sorted, using the prebuilt rank
+        return rows[np.argsort(rank[rows], kind='stable')]
+
+    def page(self, rows, page=0, page_size=PAGE_SIZE):
+        """One page of the table for the given row positions"""
+        start = page * page_size
+        return self.df.take(rows[start:start + page_size])
+
+def get_employee_index():
+    """Index for the current data, rebuilt only when the CSV changes"""
+    if sql_backend_enabled():
+        # Searches and pages are served by the database instead
+        from sql_backend import employee_index
+        return employee_index
+    return derived(EmployeeIndex)
+
+@st.fragment
+def employee_details_table():
+    """
+    Searchable, sortable details table served one page at a time.
+
+    Runs as a fragment, so typing a search or paging reruns only the table.
+    """
+    index = get_employee_index()
+    # Search and sort controls
+    cols = st.columns([3, 2, 2, 2, 1])
+    with cols[0]:
+        term = st.text_input("Search", placeholder="Name, employee ID, department or position")
+    with cols[1]:
+        field = st.selectbox("Search in", options=['All'] + list(SEARCH_FIELDS))
+    with cols[2]:
+        mode = st.selectbox("Match", options=['prefix', 'substring', 'exact'],
+                            format_func=str.capitalize)
+    with cols[3]:
+        sort_by = st.selectbox("Sort by", options=DISPLAY_COLUMNS)
+    with cols[4]:
+        descending = st.toggle("Desc.")
+
+    field = None if field == 'All' else field
+    rows = index.rows(term.strip(), field, mode, sort_by, not descending)
+    total = len(rows)
+    pages = max((total - 1) // PAGE_SIZE + 1, 1)
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
+
+    # Only the requested page is sent to the browser
+    st.dataframe(index.page(rows, page - 1), hide_index=True)
+    first = (page - 1) * PAGE_SIZE
+    st.caption(f"Showing {min(first + 1, total)}-{min(first + PAGE_SIZE, total)} of {total:,} employees")
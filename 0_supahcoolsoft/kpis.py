@@ -1,14 +1,154 @@
+import io
+import threading
 import pandas as pd
-from read_data import read_data
+from read_data import (
+    DATA_FILE, COLUMN_TYPES, NUMERIC_COLUMNS, CATEGORY_COLUMNS, file_version, read_data_versioned, prepare
+)
+from common.sqlstore import sql_backend_enabled
 
-# Read Dataframe from CSV file
-df = read_data()
+# Number of bytes before the last read position that must be unchanged for
+# the file to count as appended to rather than rewritten
+FINGERPRINT_BYTES = 4096
 
-# Convert age and salary to numeric values for calculations 
-df['Age'] = pd.to_numeric(df['Age'], errors='coerce')
-df['Salary_SEK'] = pd.to_numeric(df['Salary_SEK'], errors='coerce')
+SUM_COLUMNS = ['employees', 'age_sum', 'age_count', 'salary_sum', 'salary_count']
+# Columns parsed from appended rows, all that prepare() and the sums need
+TAIL_COLUMNS = CATEGORY_COLUMNS + NUMERIC_COLUMNS
 
-# Calculate overall KPIs
-total_employees = len(df)
-average_age = round(df['Age'].mean(), 1)
-average_salary = round(df['Salary_SEK'].mean(), 2)
\ No newline at end of file
+def department_sums(df):
+    """Running-sum building blocks per department for a chunk of rows"""
+    grouped = df.groupby('Department', observed=True, dropna=False)
+    sums = pd.DataFrame({
+        'employees': grouped.size(),
+        'age_sum': grouped['Age'].sum(),
+        'age_count': grouped['Age'].count(),
+        'salary_sum': grouped['Salary_SEK'].sum(),
+        'salary_count': grouped['Salary_SEK'].count(),
+    })
+    sums.index = sums.index.astype(str)
+    return sums
+
+class KpiEngine:
+    """
+    Keeps running sums and counts for the employee KPIs.
+
+    The sums follow the served snapshot of read_data, so they always match
+    the charts and the "Data as of" caption. When the snapshot moves on and
+    the file was only appended to, the new rows are parsed from the file
+    and folded in on their own. The sums are recomputed from the snapshot's
+    frame when the file was rewritten, i.e. it shrank or the bytes before
+    the last read position changed, or when the file on disk is already
+    newer than the snapshot.
+    """
+
+    def __init__(self, path=DATA_FILE):
+        self.path = path
+        self.columns = None
+        self.sums = pd.DataFrame(columns=SUM_COLUMNS)
+        self.offset = None
+        self.fingerprint = None
+        self.version = None
+        self.lock = threading.Lock()
+
+    def _read_fingerprint(self, f, offset):
+        f.seek(max(offset - FINGERPRINT_BYTES, 0))
+        return f.read(min(offset, FINGERPRINT_BYTES))
+
+    def _on_disk(self, version):
+        """Whether the file on disk is still the given version"""
+        try:
+            return file_version(self.path) == version
+        except OSError:
+            return False
+
+    def _full_recompute(self, df, version):
+        # Names of every column in the file, appended rows have all of them
+        self.columns = list(pd.read_csv(self.path, nrows=0).columns)
+        self.sums = department_sums(df)
+        self.offset = version[1]
+        with open(self.path, 'rb') as f:
+            fingerprint = self._read_fingerprint(f, self.offset)
+        # Only bytes of the version that was summed can vouch for an append,
+        # a file that changed meanwhile is recomputed from the next snapshot
+        self.fingerprint = fingerprint if self._on_disk(version) else None
+        self.version = version
+
+    def _read_tail(self, f, size):
+        """(rows, end) of the complete lines between the last read position and size"""
+        f.seek(self.offset)
+        tail = f.read(size - self.offset)
+        # Only consume complete lines, a row still being written waits
+        end = tail.rfind(b'\n') + 1
+        if end == 0:
+            return None, self.offset
+        chunk = pd.read_csv(
+            io.BytesIO(tail[:end]), header=None, names=self.columns,
+            usecols=TAIL_COLUMNS, dtype={col: COLUMN_TYPES[col] for col in CATEGORY_COLUMNS}
+        )
+        return chunk, self.offset + end
+
+    def _fold_in_tail(self, version):
+        """Fold in the rows appended up to version, False when the file is not that append"""
+        if self.fingerprint is None or not self.fingerprint.endswith(b'\n') or version[1] < self.offset:
+            return False
+        with open(self.path, 'rb') as f:
+            if self._read_fingerprint(f, self.offset) != self.fingerprint:
+                return False
+            chunk, offset = self._read_tail(f, version[1])
+            fingerprint = self._read_fingerprint(f, offset)
+        # The bytes read must be the snapshot's, not a later rewrite
+        if not self._on_disk(version):
+            return False
+        if chunk is not None and len(chunk):
+            self.sums = self.sums.add(department_sums(prepare(chunk)), fill_value=0)
+        self.offset = offset
+        self.fingerprint = fingerprint
+        self.version = version
+        return True
+
+    def refresh(self):
+        """Bring the sums up to date with the served snapshot"""
+        df, version = read_data_versioned()
+        with self.lock:
+            if version == self.version:
+                return
+            if self.offset is None or not self._fold_in_tail(version):
+                self._full_recompute(df, version)
+
+    def department_kpis(self):
+        """Employee count, average age and average salary per department"""
+        self.refresh()
+        sums = self.sums
+        return pd.DataFrame({
+            'employees': sums['employees'].astype('int64'),
+            'average_age': sums['age_sum'] / sums['age_count'],
+            'average_salary': sums['salary_sum'] / sums['salary_count'],
+        }).sort_index()
+
+    def company_kpis(self):
+        """Total employees, average age and average salary for the company"""
+        self.refresh()
+        totals = self.sums.sum()
+        return {
+            'total_employees': int(totals['employees']),
+            'average_age': round(float(totals['age_sum'] / totals['age_count']), 1),
+            'average_salary': round(float(totals['salary_sum'] / totals['salary_count']), 2),
+        }
+
+# One engine per process, shared by every session
+engine = KpiEngine()
+
+def company_kpis():
+    if sql_backend_enabled():
+        from sql_backend import company_kpis as sql_company_kpis
+        return sql_company_kpis()
+    return engine.company_kpis()
+
+def department_kpis():
+    if sql_backend_enabled():
+        from sql_backend import department_kpis as sql_department_kpis
+        return sql_department_kpis()
+    return engine.department_kpis()
+
+if __name__ == '__main__':
+    print(company_kpis())
+    print(department_kpis())
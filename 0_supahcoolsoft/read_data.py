@@ -1,21 +1,101 @@
 import pandas as pd
 from pathlib import Path
+from common.columnar_cache import load_columnar
+from common.ingest import read_csv, log_progress
+from common.refresher import data_source
 
-def read_data():
-    # Creates the path to data folder
-    data_path = Path(__file__).parent / "data"
-    # Create data folder if doesen't exist
-    data_path.mkdir(exist_ok=True, parents=True)
-    # Read CSV file
-    df = pd.read_csv(data_path / "supahcoolsoft.csv")
-        
+DATA_FILE = Path(__file__).parent / "data" / "supahcoolsoft.csv"
+
+# Column types used everywhere in the dashboard. Age and salary are coerced
+# to float once at load so NaNs from bad rows never change the dtype.
+NUMERIC_COLUMNS = ['Age', 'Salary_SEK']
+CATEGORY_COLUMNS = ['Department', 'Position']
+# Declared up front so the parser never infers them
+COLUMN_TYPES = {
+    'EmployeeID': 'str',
+    'FirstName': 'str',
+    'LastName': 'str',
+    **{col: 'category' for col in CATEGORY_COLUMNS}
+}
+# No view shows the contact details, so they are never parsed
+SKIPPED_COLUMNS = ['Email', 'PhoneNumber']
+
+def file_version(path=DATA_FILE):
+    """Return (mtime_ns, size) of the data file, used to detect changes"""
+    stat = Path(path).stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+def prepare(df):
+    """Apply the dashboard dtypes to a freshly parsed frame"""
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype('category')
     return df
 
+def used_columns(path=DATA_FILE):
+    """CSV columns the dashboard reads"""
+    header = pd.read_csv(path, nrows=0).columns
+    return [col for col in header if col not in SKIPPED_COLUMNS]
+
+def parse_csv(path=DATA_FILE):
+    """Parse the CSV in parallel chunks with the dashboard dtypes"""
+    return prepare(read_csv(
+        path, usecols=used_columns(path), dtype=COLUMN_TYPES, progress=log_progress(Path(path).name)
+    ))
+
+def read_chunks(path=DATA_FILE, chunksize=100_000):
+    """Parse the CSV a chunk at a time, with the dashboard dtypes"""
+    for chunk in pd.read_csv(path, usecols=used_columns(path), dtype=COLUMN_TYPES, chunksize=chunksize):
+        yield prepare(chunk)
+
+def load_frame():
+    """Memory-mapped from the columnar cache, parsed only when the CSV is new"""
+    return load_columnar(DATA_FILE, parse_csv, schema=COLUMN_TYPES)
+
+# Process-wide data shared by every Streamlit session, refreshed in the background
+source = data_source(DATA_FILE, load_frame, file_version)
+
+def read_data_versioned():
+    """Return (frame, version) of the served data, loading it on first use"""
+    DATA_FILE.parent.mkdir(exist_ok=True, parents=True)
+    snapshot = source.current()
+    return snapshot.frame, snapshot.version
+
+def derived(build, *inputs):
+    """
+    build(frame) for the served data, shared by every session and rebuilt in
+    the background with every new version. See DataSource.derived for inputs.
+    """
+    return source.derived(build, *inputs)
+
+def data_caption():
+    """'Data as of ...' line for the dashboard"""
+    return source.caption()
+
+def read_data():
+    """
+    Return the employee data as one shared, read-only DataFrame.
+
+    The frame is loaded once per process. When the file's mtime or size
+    changes it is reloaded on a background thread and swapped in, the
+    previous frame is served until then. Its columns are memory-mapped from
+    the columnar cache next to the CSV, shared by every worker process.
+    Callers must not modify the returned frame; take a copy first if you
+    need to.
+    """
+    return read_data_versioned()[0]
+
+def data_version():
+    """Version of the data currently returned by read_data()"""
+    return read_data_versioned()[1]
+
 # Runs only when the script is executed directly
 if __name__ == '__main__':
     # Call the read_data function
     df = read_data()
     print(f"All columns: {df.columns}")
-    
+    print(f"\nDtypes:\n{df.dtypes}")
+
     print("\nFirst 5 rows:")
-    print(df.head())
\ No newline at end of file
+    print(df.head())
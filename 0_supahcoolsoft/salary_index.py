@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from read_data import derived
+from employee_table import DISPLAY_COLUMNS, PAGE_SIZE, EmployeeIndex
+from common.sqlstore import sql_backend_enabled
+
+# Salaries are ranked within the whole company (None) or one of these columns
+GROUPINGS = [None, 'Department', 'Position']
+# Default peer band, as a fraction of the employee's salary
+DEFAULT_BAND = 0.05
+
+class SortedGroups:
+    """
+    Salaries of one grouping, sorted within each group.
+
+    Group g holds values[offsets[g]:offsets[g + 1]] in ascending order, and
+    rows holds their row positions in the same order (ties in table order).
+    by_salary is every row with a salary, already sorted by it. Employees
+    without a group are left out.
+    """
+
+    def __init__(self, codes, groups, salary, by_salary):
+        rows = by_salary[codes[by_salary] >= 0]
+        # A stable sort on the small group codes keeps each group in salary order
+        self.rows = rows[np.argsort(codes[rows], kind='stable')]
+        self.values = salary[self.rows]
+        counts = np.bincount(codes[rows], minlength=len(groups))
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+        self.lookup = {group: code for code, group in enumerate(groups)}
+
+    def group(self, group):
+        """(sorted salaries, row positions) of one group"""
+        code = self.lookup.get(group)
+        if code is None:
+            return self.values[:0], self.rows[:0]
+        start, end = self.offsets[code], self.offsets[code + 1]
+        return self.values[start:end], self.rows[start:end]
+
+class SalaryIndex:
+    """
+    Salaries sorted for the whole company and per Department and Position.
+
+    Ranks, percentiles and salary ranges are binary searches in one group's
+    sorted slice, whatever the size of the table.
+    """
+
+    def __init__(self, employees):
+        # The details table's rows and its exact-match EmployeeID index
+        self.df = employees.df
+        self.employee_ids = employees.columns['EmployeeID']
+        salary = self.df['Salary_SEK'].to_numpy('float64')
+        # The one full sort, every grouping reuses it
+        by_salary = np.flatnonzero(~np.isnan(salary))
+        by_salary = by_salary[np.argsort(salary[by_salary], kind='stable')]
+        self.groupings = {None: SortedGroups(np.zeros(len(salary), dtype='int8'), [None], salary, by_salary)}
+        for by in GROUPINGS[1:]:
+            column = self.df[by].astype('category')
+            self.groupings[by] = SortedGroups(
+                column.cat.codes.to_numpy(), list(column.cat.categories), salary, by_salary
+            )
+
+    def record(self, employee_id):
+        """One employee's row as a dict (the first one for duplicate IDs), or None"""
+        # The ID index files missing IDs under ''
+        rows = self.employee_ids.exact(employee_id) if employee_id else []
+        if len(rows) == 0:
+            return None
+        return self.df.iloc[rows[0]].to_dict()
+
+    def rank(self, salary, by=None, group=None):
+        """(rank, group size); 1 is the highest salary and ties share a rank"""
+        values, _ = self.groupings[by].group(group)
+        return len(values) - int(np.searchsorted(values, salary, side='right')) + 1, len(values)
+
+    def percentile(self, salary, by=None, group=None):
+        """Share of the group earning at most salary, in percent"""
+        values, _ = self.groupings[by].group(group)
+        if len(values) == 0:
+            return np.nan
+        return 100 * int(np.searchsorted(values, salary, side='right')) / len(values)
+
+    def between(self, low, high, by=None, group=None, limit=None, near=None):
+        """
+        (frame, total) of the group earning from low to high, by salary.
+
+        With a limit only the limit rows closest to the salary `near` are
+        returned, still ordered by salary.
+        """
+        values, rows = self.groupings[by].group(group)
+        start = np.searchsorted(values, low, side='left')
+        end = np.searchsorted(values, high, side='right')
+        values, rows = values[start:end], rows[start:end]
+        if limit is not None and len(rows) > limit:
+            # Sorted salaries: the closest ones are one window, grown from near
+            near = low if near is None else near
+            first = last = int(np.searchsorted(values, near))
+            while last - first < limit:
+                if last == len(values) or (first > 0 and near - values[first - 1] <= values[last] - near):
+                    first -= 1
+                else:
+                    last += 1
+            rows = rows[first:last]
+        return self.df.take(rows), int(end - start)
+
+def get_salary_index():
+    """Salary index for the current data, rebuilt only when the CSV changes"""
+    if sql_backend_enabled():
+        # Ranks and ranges are counted by the database instead
+        from sql_backend import salary_index
+        return salary_index
+    # Shares the details table's rows and ID index of the same data version
+    return derived(SalaryIndex, EmployeeIndex)
+
+def employee_position(index, employee_id, by=None):
+    """
+    Where one employee's salary sits within the company or their group.
+
+    Returns the employee's row as a dict plus 'group', 'rank', 'size' and
+    'percentile' (rank is None without a salary or group), or None if the
+    ID is unknown.
+    """
+    record = index.record(employee_id)
+    if record is None:
+        return None
+    salary = record['Salary_SEK']
+    group = None if by is None else record[by]
+    if pd.isna(salary) or (by is not None and pd.isna(group)):
+        return {**record, 'group': group, 'rank': None, 'size': 0, 'percentile': np.nan}
+    rank, size = index.rank(salary, by, group)
+    return {
+        **record, 'group': group, 'rank': rank, 'size': size,
+        'percentile': index.percentile(salary, by, group)
+    }
+
+def peer_band(index, employee_id, band=DEFAULT_BAND, by=None, limit=None):
+    """
+    (position, peers, total): the employee's position and the colleagues
+    in the same group earning within ±band of their salary.
+
+    peers includes the employee; with a limit it holds the limit peers
+    closest in salary. position is None for an unknown ID.
+    """
+    position = employee_position(index, employee_id, by)
+    if position is None or position['rank'] is None:
+        return position, pd.DataFrame(columns=DISPLAY_COLUMNS), 0
+    salary = position['Salary_SEK']
+    peers, total = index.between(
+        salary * (1 - band), salary * (1 + band), by, position['group'], limit=limit, near=salary
+    )
+    return position, peers, total
+
+@st.fragment
+def salary_lookup():
+    """
+    Percentile, rank and salary peers of one employee.
+
+    Runs as a fragment, so a lookup reruns only this section.
+    """
+    index = get_salary_index()
+    cols = st.columns([2, 2, 3])
+    with cols[0]:
+        employee_id = st.text_input("Employee ID", placeholder="E042")
+    with cols[1]:
+        by = st.selectbox("Compare within", options=['Department', 'Position', 'Company'])
+    with cols[2]:
+        band = st.slider("Peer band (± % of salary)", min_value=1, max_value=25, value=5)
+
+    employee_id = employee_id.strip()
+    if not employee_id:
+        st.caption("Enter an employee ID to see where their salary sits.")
+        return
+    by = None if by == 'Company' else by
+    position, peers, total = peer_band(index, employee_id, band / 100, by, limit=PAGE_SIZE)
+    if position is None:
+        st.warning(f"No employee with ID {employee_id}.")
+        return
+    name = f"{position['FirstName']} {position['LastName']}"
+    if position['rank'] is None:
+        st.info(f"{name} has no salary or {by.lower() if by else 'group'} on record.")
+        return
+
+    within = position['group'] if by else "the company"
+    cols = st.columns(3)
+    with cols[0]:
+        st.metric(label="Salary", value=f"{position['Salary_SEK']:,.0f} SEK")
+    with cols[1]:
+        st.metric(label=f"Percentile in {within}", value=f"{position['percentile']:.1f}")
+    with cols[2]:
+        st.metric(label=f"Rank in {within}", value=f"{position['rank']:,} of {position['size']:,}")
+
+    st.markdown(f"**Salary peers of {name}** (± {band}% in {within})")
+    st.dataframe(peers, hide_index=True)
+    st.caption(
+        f"{total:,} employees in the band" + (f", the {len(peers)} closest in salary shown" if total > len(peers) else "")
+    )
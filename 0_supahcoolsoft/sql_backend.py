@@ -0,0 +1,295 @@
+import threading
+import numpy as np
+import pandas as pd
+from read_data import DATA_FILE, read_chunks
+from aggregates import NBINS
+from employee_table import DISPLAY_COLUMNS, SEARCH_FIELDS, PAGE_SIZE
+from common.sqlstore import SqlStore
+
+# Lower-cased copies of the searchable columns, so searches match the
+# in-memory index (Python lower-casing, not SQLite's ASCII-only lower())
+SEARCH_COLUMNS = ['FullName'] + [col for fields in SEARCH_FIELDS.values() for col in fields if col != 'FullName']
+
+COLUMNS = {
+    'EmployeeID': 'TEXT',
+    'FirstName': 'TEXT',
+    'LastName': 'TEXT',
+    'Age': 'REAL',
+    'Department': 'TEXT',
+    'Position': 'TEXT',
+    'Salary_SEK': 'REAL',
+    **{f'key_{col}': 'TEXT' for col in SEARCH_COLUMNS},
+}
+
+def employee_chunks(path, chunksize):
+    """Display columns plus search keys; contact details are never stored"""
+    for chunk in read_chunks(path, chunksize):
+        chunk['FullName'] = chunk['FirstName'].fillna('') + ' ' + chunk['LastName'].fillna('')
+        for col in SEARCH_COLUMNS:
+            chunk[f'key_{col}'] = chunk[col].astype(object).fillna('').astype(str).str.lower()
+        yield chunk
+
+store = SqlStore(
+    DATA_FILE, 'employees', COLUMNS, employee_chunks,
+    indexes=[('Salary_SEK',), ('Department', 'Salary_SEK'), ('Position', 'Salary_SEK'), ('Department', 'Age')]
+    + [(f'key_{col}',) for col in SEARCH_COLUMNS]
+)
+
+# Aggregates cache shared by every session: (version, aggregates)
+_cache = {}
+_lock = threading.Lock()
+
+def row_count():
+    return store.scalar('SELECT COUNT(*) FROM employees')
+
+def departments():
+    """Sorted distinct departments, the same order as the pandas categories"""
+    return store.query(
+        'SELECT DISTINCT Department FROM employees WHERE Department IS NOT NULL ORDER BY Department'
+    )['Department'].tolist()
+
+def histogram(column, nbins=NBINS):
+    """(edges, counts) with the same fixed edges as aggregates.histogram"""
+    low, high = store.query(
+        f'SELECT MIN({column}) AS low, MAX({column}) AS high FROM employees'
+    ).iloc[0]
+    if pd.isna(low):
+        return np.zeros(nbins + 1), np.zeros(nbins, dtype='int64')
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, nbins + 1)
+    bins = store.query(
+        f'SELECT MIN(CAST(({column} - ?) * ? AS INTEGER), ?) AS bin, COUNT(*) AS count '
+        f'FROM employees WHERE {column} IS NOT NULL GROUP BY bin',
+        (low, nbins / (high - low), nbins - 1)
+    )
+    counts = np.zeros(nbins, dtype='int64')
+    counts[bins['bin'].to_numpy()] = bins['count'].to_numpy()
+    return edges, counts
+
+def box_stats(column):
+    """
+    Per-department box statistics in the same format as aggregates.box_stats.
+
+    The database ranks each department's values; only the rows at the
+    quartile positions, the fences and the outliers come back.
+    """
+    quartiles = {'q1': 0.25, 'median': 0.5, 'q3': 0.75}
+    picks = ',\n'.join(
+        f'MAX(CASE WHEN pos = CAST({q} * (n - 1) AS INTEGER) THEN v END) AS {name}_lo, '
+        f'MAX(CASE WHEN pos = MIN(CAST({q} * (n - 1) AS INTEGER) + 1, n - 1) THEN v END) AS {name}_hi'
+        for name, q in quartiles.items()
+    )
+    ranked = store.query(f'''
+        WITH ranked AS (
+            SELECT Department AS grp, {column} AS v,
+                   ROW_NUMBER() OVER (PARTITION BY Department ORDER BY {column}) - 1 AS pos,
+                   COUNT(*) OVER (PARTITION BY Department) AS n
+            FROM employees
+            WHERE Department IS NOT NULL AND {column} IS NOT NULL
+        )
+        SELECT grp, n, {picks}
+        FROM ranked GROUP BY grp ORDER BY grp
+    ''')
+
+    # Linear interpolation between the two ranked values around each quartile
+    sizes = ranked['n'].to_numpy()
+    stats = pd.DataFrame(index=pd.Index(ranked['grp'].tolist(), name='group'))
+    for name, q in quartiles.items():
+        pos = q * (sizes - 1)
+        frac = pos - np.floor(pos)
+        lo, hi = ranked[f'{name}_lo'].to_numpy(), ranked[f'{name}_hi'].to_numpy()
+        stats[name] = lo + frac * (hi - lo)
+    iqr = stats['q3'] - stats['q1']
+    limits = list(zip(stats.index, stats['q1'] - 1.5 * iqr, stats['q3'] + 1.5 * iqr))
+    if not limits:
+        stats['lowerfence'] = stats['upperfence'] = stats['count'] = []
+        return stats, []
+
+    limits_sql = f'''
+        WITH limits(grp, low, high) AS (VALUES {', '.join(['(?, ?, ?)'] * len(limits))})
+    '''
+    params = [value for row in limits for value in row]
+    fences = store.query(limits_sql + f'''
+        SELECT l.grp AS grp,
+               MIN(CASE WHEN e.{column} >= l.low THEN e.{column} END) AS lowerfence,
+               MAX(CASE WHEN e.{column} <= l.high THEN e.{column} END) AS upperfence
+        FROM employees e JOIN limits l ON e.Department = l.grp
+        GROUP BY l.grp
+    ''', params).set_index('grp')
+    outliers = store.query(limits_sql + f'''
+        SELECT l.grp AS grp, e.{column} AS v
+        FROM employees e JOIN limits l ON e.Department = l.grp
+        WHERE e.{column} < l.low OR e.{column} > l.high
+        ORDER BY l.grp, e.{column}
+    ''', params)
+
+    stats['lowerfence'] = fences['lowerfence'].reindex(stats.index).to_numpy()
+    stats['upperfence'] = fences['upperfence'].reindex(stats.index).to_numpy()
+    stats['count'] = sizes
+    grouped = outliers.groupby('grp')['v']
+    points = [
+        grouped.get_group(dept).to_numpy() if dept in grouped.groups else np.empty(0)
+        for dept in stats.index
+    ]
+    return stats, points
+
+def compute_aggregates(nbins=NBINS):
+    """The aggregates.compute_aggregates dict, computed inside the database"""
+    dept_counts = store.query('''
+        SELECT Department, COUNT(*) AS Count FROM employees
+        WHERE Department IS NOT NULL
+        GROUP BY Department ORDER BY Count DESC, Department
+    ''')
+    return {
+        'departments': departments(),
+        'dept_counts': dept_counts,
+        'salary_hist': histogram('Salary_SEK', nbins),
+        'age_hist': histogram('Age', nbins),
+        'salary_box': box_stats('Salary_SEK'),
+        'age_box': box_stats('Age'),
+    }
+
+def get_aggregates():
+    """Aggregates for the current database, recomputed only when the CSV changes"""
+    version = store.ensure()
+    with _lock:
+        if _cache.get('version') != version:
+            _cache['aggregates'] = compute_aggregates()
+            _cache['version'] = version
+        return _cache['aggregates']
+
+def company_kpis():
+    """Same dict as kpis.company_kpis"""
+    totals = store.query(
+        'SELECT COUNT(*) AS employees, AVG(Age) AS age, AVG(Salary_SEK) AS salary FROM employees'
+    ).iloc[0]
+    return {
+        'total_employees': int(totals['employees']),
+        'average_age': round(float(totals['age']), 1),
+        'average_salary': round(float(totals['salary']), 2),
+    }
+
+def department_kpis():
+    """Same table as kpis.department_kpis"""
+    return store.query('''
+        SELECT COALESCE(Department, 'nan') AS Department, COUNT(*) AS employees,
+               AVG(Age) AS average_age, AVG(Salary_SEK) AS average_salary
+        FROM employees GROUP BY Department
+    ''').set_index('Department').rename_axis(None).sort_index()
+
+class SqlSelection:
+    """Matching rows of a details-table search, counted but not fetched"""
+
+    def __init__(self, where, params, order, total):
+        self.where = where
+        self.params = params
+        self.order = order
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+class SqlEmployeeIndex:
+    """
+    Details-table index served by the database.
+
+    Same rows() and page() interface as employee_table.EmployeeIndex, but a
+    search only counts its matches; each page is fetched with LIMIT/OFFSET.
+    """
+
+    def _match(self, term, field, mode):
+        columns = SEARCH_FIELDS[field] if field else SEARCH_COLUMNS
+        term = term.lower()
+        clauses, params = [], []
+        for col in columns:
+            key = f'key_{col}'
+            if mode == 'exact':
+                clauses.append(f'{key} = ?')
+                params.append(term)
+            elif mode == 'substring':
+                clauses.append(f'instr({key}, ?) > 0')
+                params.append(term)
+            else:
+                # Range scan on the index, the same bounds as ColumnIndex.prefix
+                clauses.append(f'({key} >= ? AND {key} < ?)')
+                params.extend([term, term + '\uffff'])
+        return ' OR '.join(clauses), params
+
+    def rows(self, term='', field=None, mode='prefix', sort_by='EmployeeID', ascending=True):
+        where, params = self._match(term, field, mode) if term else ('1', [])
+        direction = 'ASC' if ascending else 'DESC'
+        # Missing values last and ties in file order, as in the pandas table
+        order = f'"{sort_by}" IS NULL, "{sort_by}" {direction}, rowid'
+        total = store.scalar(f'SELECT COUNT(*) FROM employees WHERE {where}', params)
+        return SqlSelection(where, params, order, total)
+
+    def page(self, rows, page=0, page_size=PAGE_SIZE):
+        columns = ', '.join(f'"{col}"' for col in DISPLAY_COLUMNS)
+        return store.query(
+            f'SELECT {columns} FROM employees WHERE {rows.where} '
+            f'ORDER BY {rows.order} LIMIT ? OFFSET ?',
+            rows.params + [page_size, page * page_size]
+        )
+
+employee_index = SqlEmployeeIndex()
+
+class SqlSalaryIndex:
+    """
+    Salary lookups served by the database.
+
+    Same interface as salary_index.SalaryIndex. Ranks and ranges are counts
+    over a range of the (group, salary) indexes instead of binary searches.
+    """
+
+    def _group(self, by, group):
+        if by is None:
+            return 'Salary_SEK IS NOT NULL', []
+        return f'"{by}" = ? AND Salary_SEK IS NOT NULL', [group]
+
+    def record(self, employee_id):
+        columns = ', '.join(f'"{col}"' for col in DISPLAY_COLUMNS)
+        rows = store.query(
+            f'SELECT {columns} FROM employees WHERE key_EmployeeID = ? ORDER BY rowid LIMIT 1',
+            [employee_id.lower()]
+        )
+        return None if rows.empty else rows.iloc[0].to_dict()
+
+    def rank(self, salary, by=None, group=None):
+        where, params = self._group(by, group)
+        size = store.scalar(f'SELECT COUNT(*) FROM employees WHERE {where}', params)
+        above = store.scalar(f'SELECT COUNT(*) FROM employees WHERE {where} AND Salary_SEK > ?', params + [salary])
+        return above + 1, size
+
+    def percentile(self, salary, by=None, group=None):
+        where, params = self._group(by, group)
+        size = store.scalar(f'SELECT COUNT(*) FROM employees WHERE {where}', params)
+        if size == 0:
+            return np.nan
+        at_most = store.scalar(f'SELECT COUNT(*) FROM employees WHERE {where} AND Salary_SEK <= ?', params + [salary])
+        return 100 * at_most / size
+
+    def between(self, low, high, by=None, group=None, limit=None, near=None):
+        where, params = self._group(by, group)
+        where, params = f'{where} AND Salary_SEK BETWEEN ? AND ?', params + [low, high]
+        total = store.scalar(f'SELECT COUNT(*) FROM employees WHERE {where}', params)
+        columns = ', '.join(f'"{col}"' for col in DISPLAY_COLUMNS)
+        if limit is None:
+            frame = store.query(
+                f'SELECT {columns} FROM employees WHERE {where} ORDER BY Salary_SEK, rowid', params
+            )
+        else:
+            # The limit rows closest to near, then back in salary order
+            frame = store.query(
+                f'SELECT {columns} FROM (SELECT *, rowid AS row FROM employees WHERE {where} '
+                f'ORDER BY ABS(Salary_SEK - ?), Salary_SEK, rowid LIMIT ?) ORDER BY Salary_SEK, row',
+                params + [low if near is None else near, limit]
+            )
+        return frame, total
+
+salary_index = SqlSalaryIndex()
+
+if __name__ == '__main__':
+    print(company_kpis())
+    print(get_aggregates()['dept_counts'])
+    print(get_aggregates()['salary_box'][0])
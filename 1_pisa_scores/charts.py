@@ -2,7 +2,14 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import numpy as np
+from figure_cache import cached_figure, selection_key
+from common.downsample import MAX_POINTS, use_webgl, lttb, annotate_reduction
+from common.figure_payload import compact_figure
+
+# Bins of the score distribution, counted on the server
+NBINS = 20
 
 def validate_selection(locations, min_count=1, max_count=None):
     if locations is None or len(locations) < min_count:
@@ -13,78 +20,205 @@ def validate_selection(locations, min_count=1, max_count=None):
         return False
     return True
 
-def scores_by_location_bar(df, country_codes):
+# The chart inputs are either a filtered DataFrame or, with the SQL backend,
+# a sql_backend.SqlSelection that aggregates inside the database
+
+def location_averages(data):
+    """Average score per location"""
+    if isinstance(data, pd.DataFrame):
+        return data.groupby('location', observed=True)['value'].mean().reset_index()
+    return data.location_averages()
+
+def trend_averages(data):
+    """Average score per location, year and indicator"""
+    if isinstance(data, pd.DataFrame):
+        return data.groupby(['location', 'time_period', 'indicator'], observed=True)['value'].mean().reset_index()
+    return data.trend_averages()
+
+def score_values(data):
+    """Frame holding just the score column"""
+    if isinstance(data, pd.DataFrame):
+        return data[['value']]
+    return data.values()
 
-    location_avg = df.groupby('location')['value'].mean().reset_index()
+def scores_by_location_figure(df, country_codes):
+
+    location_avg = location_averages(df)
     location_avg = location_avg.sort_values('value', ascending=False)
-    location_avg['country_name'] = location_avg['location'].map(lambda x: country_codes.get(x, x))
-    
-    fig = px.bar(
-        location_avg,
-        x='location', y='value',
-        text=location_avg['value'].round(1),
-        title="Average PISA Scores by Country",
-        color='location',
-        hover_data=['country_name']
-    )
-    fig.update_traces(texttemplate='%{text:.1f}', textposition='outside')
+    country_names = location_avg['location'].map(lambda x: country_codes.get(x, x))
+
+    # One trace with a color per bar: the codes, scores and labels are sent
+    # once instead of a trace per country repeating them. The bars stay
+    # keyed by code, two countries with the same name are still two bars.
+    colorway = pio.templates[pio.templates.default].layout.colorway or px.colors.qualitative.Plotly
+    fig = go.Figure(go.Bar(
+        x=location_avg['location'].astype(str).to_numpy(), y=location_avg['value'].to_numpy(),
+        hovertext=country_names.to_numpy(),
+        texttemplate='%{y:.1f}', textposition='outside',
+        hovertemplate='%{hovertext} (%{x})<br>Average Score: %{y:.1f}<extra></extra>',
+        marker_color=[colorway[i % len(colorway)] for i in range(len(location_avg))]
+    ))
     fig.update_layout(
-        xaxis_title="Country Code", yaxis_title="Average Score",
+        title="Average PISA Scores by Country",
+        xaxis_title="Country", yaxis_title="Average Score",
         showlegend=False, height=500
     )
-    fig.update_xaxes(ticktext=location_avg['country_name'], tickvals=location_avg['location'])
-    
+    fig.update_xaxes(ticktext=country_names.to_numpy(), tickvals=location_avg['location'].astype(str).to_numpy())
+    return compact_figure(fig)
+
+def scores_by_location_bar(load, country_codes, cache_key=None):
+
+    # Reuse the figure if this selection was already drawn by any session,
+    # load() filters the data only when it was not
+    fig = cached_figure(cache_key, lambda: scores_by_location_figure(load(), country_codes))
     st.plotly_chart(fig, use_container_width=True)
 
-def score_trends_by_location(df, selected_locations, country_codes):
+def downsample_lines(df, x, y, series, max_points=MAX_POINTS):
+    """Reduce every series with LTTB so all series together fit in max_points"""
+    if len(df) <= max_points:
+        return df
+    per_series = max(max_points // df[series].nunique(), 3)
+    keep = []
+    for _, line in df.sort_values([series, x]).groupby(series, observed=True):
+        keep.append(line.iloc[lttb(line[x].to_numpy(), line[y].to_numpy(), per_series)])
+    return pd.concat(keep)
+
+def add_projections(fig, projections, country_codes):
+    """Dashed projected trend line per country, in the colour of its score line"""
+    colors = {trace.name: trace.line.color for trace in fig.data}
+    for location, line in projections.groupby('location', sort=False):
+        name = country_codes.get(location, location)
+        fig.add_trace(go.Scatter(
+            x=line['time_period'], y=line['value'],
+            customdata=line[['lower', 'upper']].to_numpy(),
+            mode='lines', name=f"{name} (trend)", legendgroup=name, showlegend=False,
+            line=dict(color=colors.get(name), dash='dash'),
+            hovertemplate=f"{name}<br>%{{x}}: %{{y:.1f}} projected<br>"
+                          "95%: %{customdata[0]:.1f}–%{customdata[1]:.1f}<extra></extra>"
+        ))
+
+def score_trends_figures(df, country_codes, projections=None):
+    """
+    One (indicator, figure) pair per indicator in df.
+
+    projections (see trends.TrendFits.projection_lines) are overlaid as
+    dashed lines.
+    """
+
+    trends_df = trend_averages(df)
+    trends_df['country_name'] = trends_df['location'].map(lambda x: country_codes.get(x, x))
+    years = sorted(trends_df['time_period'].unique())
+    if projections is not None and len(projections):
+        years = sorted(set(years) | set(projections['time_period'].unique()))
+
+    figures = []
+    # Split by indicator in one groupby instead of one mask per tab
+    for indicator, indicator_df in trends_df.groupby('indicator', observed=True, sort=True):
+        total = len(indicator_df)
+        indicator_df = downsample_lines(indicator_df, 'time_period', 'value', 'location')
+        fig = px.line(
+            indicator_df,
+            x='time_period', y='value', color='country_name',
+            title=f"PISA Score Trends Over Time - {indicator}",
+            markers=True,
+            labels={'country_name': 'Country', 'time_period': 'Year', 'value': 'Score'},
+            render_mode='webgl' if use_webgl(len(indicator_df)) else 'auto'
+        )
+        fig.update_layout(
+            xaxis_title="Year", yaxis_title="Average Score",
+            legend_title="Country", height=500
+        )
+        fig.update_xaxes(
+            tickmode='array',
+            tickvals=years
+        )
+        if projections is not None:
+            add_projections(fig, projections[projections['indicator'] == indicator], country_codes)
+        figures.append((indicator, compact_figure(annotate_reduction(fig, len(indicator_df), total))))
+    return figures
+
+def score_trends_by_location(load, selected_locations, country_codes, cache_key=None, projections=None):
 
     if not validate_selection(selected_locations):
         return
-    
-    filtered_df = df[df['location'].isin(selected_locations)]
-    trends_df = filtered_df.groupby(['location', 'time_period', 'indicator'])['value'].mean().reset_index()
-    trends_df['country_name'] = trends_df['location'].map(lambda x: country_codes.get(x, x))
-    
-    indicators = sorted(trends_df['indicator'].unique())
-    if len(indicators) == 0:
+
+    # projections() computes the trend overlays, also only on a cache miss
+    figures = cached_figure(cache_key, lambda: score_trends_figures(
+        load(), country_codes, projections() if projections is not None else None
+    ))
+    if len(figures) == 0:
         st.warning("No data available for the selected filters.")
         return
-        
-    indicator_tabs = st.tabs([indicator for indicator in indicators])
-    
-    for i, indicator in enumerate(indicators):
-        with indicator_tabs[i]:
-            indicator_df = trends_df[trends_df['indicator'] == indicator]
-            
-            fig = px.line(
-                indicator_df,
-                x='time_period', y='value', color='country_name',
-                title=f"PISA Score Trends Over Time - {indicator}",
-                markers=True,
-                labels={'country_name': 'Country', 'time_period': 'Year', 'value': 'Score'}
-            )
-            fig.update_layout(
-                xaxis_title="Year", yaxis_title="Average Score",
-                legend_title="Country", height=500
-            )
-            fig.update_xaxes(
-                tickmode='array',
-                tickvals=sorted(trends_df['time_period'].unique())
-            )
-            
+
+    indicator_tabs = st.tabs([indicator for indicator, _ in figures])
+
+    for tab, (_, fig) in zip(indicator_tabs, figures):
+        with tab:
             st.plotly_chart(fig, use_container_width=True)
+    if projections is not None:
+        st.caption("Dashed lines: linear trend over every assessment of the selected gender, "
+                   "projected to the next assessments.")
 
-def score_distribution_histogram(df):
+def score_histogram(df, nbins=NBINS):
+    """Fixed-edge histogram of the scores: (edges, counts)"""
+    values = score_values(df)['value'].to_numpy('float64')
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.zeros(nbins + 1), np.zeros(nbins, dtype='int64')
+    low, high = values.min(), values.max()
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, nbins + 1)
+    counts, _ = np.histogram(values, bins=edges)
+    return edges, counts
 
-    fig = px.histogram(
-        df, 
-        x='value', nbins=20,
-        title="PISA Score Distribution",
-        color_discrete_sequence=['#1E3A8A'],
-        labels={'value': 'Score'}
-    )
+def score_distribution_figure(df):
+
+    # Binned here, so only the bins are sent instead of every score
+    edges, counts = score_histogram(df)
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=edges[1:] - edges[:-1],
+        marker_color='#1E3A8A',
+        hovertemplate='Score: %{x:.1f}<br>Frequency: %{y}<extra></extra>'
+    ))
     fig.update_layout(
-        xaxis_title="Score", yaxis_title="Frequency", height=400
+        title="PISA Score Distribution",
+        xaxis_title="Score", yaxis_title="Frequency", height=400,
+        bargap=0
     )
-    
+    return compact_figure(fig)
+
+def score_distribution_histogram(load, cache_key=None):
+
+    # load() filters the scores, only needed when the figure is not cached
+    fig = cached_figure(cache_key, lambda: score_distribution_figure(load()))
     st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+def score_distribution_section(index, selection, indicator_names):
+    """
+    Subject selectbox plus the score distribution histogram.
+
+    Runs as a fragment: changing the selectbox reruns only this function,
+    with the inputs passed in by the last full run of the dashboard.
+    """
+    selected_indicators = selection['indicator']
+    if len(selected_indicators) > 1:
+        indicator_for_dist = st.selectbox(
+            "Select subject for score distribution:",
+            options=selected_indicators,
+            format_func=lambda x: indicator_names.get(x, x)
+        )
+        dist_selection = {**selection, 'indicator': [indicator_for_dist]}
+    else:
+        indicator_for_dist = None
+        dist_selection = selection
+
+    st.markdown("## Score Distribution")
+    score_distribution_histogram(
+        lambda: index.filter(**dist_selection),
+        cache_key=selection_key('score_distribution', index.version,
+                                distribution=indicator_for_dist, **selection)
+    )
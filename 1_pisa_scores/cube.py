@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from read_data import derived
+
+# Cube axes, in order
+AXES = ['location', 'indicator', 'subject', 'time_period']
+
+class ScoreCube:
+    """
+    Dense array of scores indexed by location x indicator x subject x year.
+
+    Missing combinations are NaN and duplicate rows are averaged. Analytical
+    queries become slices and vectorized arithmetic on `values` instead of
+    masks and merges over the whole frame.
+    """
+
+    def __init__(self, df):
+        self.labels = {}
+        self.positions = {}
+        codes = []
+        for axis in AXES:
+            axis_codes, uniques = pd.factorize(df[axis], sort=True)
+            self.labels[axis] = uniques.tolist()
+            self.positions[axis] = {label: i for i, label in enumerate(self.labels[axis])}
+            codes.append(axis_codes)
+
+        shape = tuple(len(self.labels[axis]) for axis in AXES)
+        valid = np.all([c >= 0 for c in codes], axis=0) & df['value'].notna().to_numpy()
+        flat = np.ravel_multi_index([c[valid] for c in codes], shape)
+        sums = np.bincount(flat, weights=df['value'].to_numpy('float64')[valid], minlength=np.prod(shape))
+        counts = np.bincount(flat, minlength=np.prod(shape))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.values = (sums / counts).reshape(shape)
+
+        self.locations = np.array(self.labels['location'], dtype=object)
+        self.years = np.array(self.labels['time_period'])
+
+    def position(self, axis, label):
+        """Index of label along axis, or None if it is not in the data"""
+        return self.positions[axis].get(label)
+
+    def series(self, indicator, subject):
+        """Scores as a (location, year) array, or None if the combination is unknown"""
+        i = self.position('indicator', indicator)
+        s = self.position('subject', subject)
+        if i is None or s is None:
+            return None
+        return self.values[:, i, s, :]
+
+    def rankings(self, subject='TOT'):
+        """
+        Rank of every location for every indicator and year (1 = best).
+
+        Returns a (location, indicator, year) float array, NaN where there is
+        no score.
+        """
+        s = self.position('subject', subject)
+        scores = self.values[:, :, s, :]
+        # Sort descending with missing scores last, then invert the permutation
+        order = np.argsort(np.where(np.isnan(scores), np.inf, -scores), axis=0, kind='stable')
+        ranks = np.empty(scores.shape)
+        np.put_along_axis(ranks, order, np.arange(1, scores.shape[0] + 1)[:, None, None], axis=0)
+        ranks[np.isnan(scores)] = np.nan
+        return ranks
+
+def get_cube():
+    """Cube for the current data, rebuilt only when the CSV changes"""
+    return derived(ScoreCube)
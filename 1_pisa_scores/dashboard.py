@@ -1,12 +1,22 @@
+import functools
 import streamlit as st
-import pandas as pd
-from read_data import read_data
+from pathlib import Path
+from filter_index import get_filter_index
+from read_data import DATA_FILE, memory_footprint, data_caption
+from labels import country_codes, indicator_names, subject_names
+from figure_cache import figure_cache, selection_key
 from charts import (
     scores_by_location_bar,
     score_trends_by_location,
-    score_distribution_histogram
+    score_distribution_section
 )
-from pathlib import Path
+from trends import trend_projections, trend_ranking_section
+from common.pages import load_css, load_data
+from common.profiler import RerunProfiler
+from common.sqlstore import sql_backend_enabled
+
+# Rows shown in the sample table when the data stays in the database
+SAMPLE_ROWS = 1000
 
 # --- Page configuration ---
 st.set_page_config(
@@ -15,73 +25,25 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Load CSS from style file
-def load_css(css_file):
-    with open(css_file, 'r') as f:
-        css = f.read()
-    st.markdown(f'<style>{css}</style>', unsafe_allow_html=True)
+# Timing spans for this rerun (only recorded when profiling is enabled)
+profiler = RerunProfiler("pisa_dashboard")
 
-# Load the CSS
-try:
+# Load the CSS, the file is only read again when it changes
+with profiler.span("css load"):
     load_css(Path(__file__).parent / "style" / "style.css")
-except Exception as e:
-    st.warning(f"Could not load style.css file. Error: {e}")
 
 # --- Sidebar for filters (Bonus feature) ---
 st.sidebar.title("Filters")
 
 # Load data
-try:
-    df = read_data()
-    
-    if df.empty:
-        st.error("No data found. Please check the CSV file.")
-        st.stop()
-        
-except Exception as e:
-    st.error(f"An error occurred when loading data: {e}")
-    st.info("Please check that the file 'OECD PISA data.csv' exists in the 'data' folder.")
-    st.stop()
-
-# Define mappings for country codes to names (for better readability)
-country_codes = {
-    'AUS': 'Australia', 'AUT': 'Austria', 'BEL': 'Belgium', 'CAN': 'Canada', 
-    'CHL': 'Chile', 'COL': 'Colombia', 'CZE': 'Czech Republic', 'DNK': 'Denmark', 
-    'EST': 'Estonia', 'FIN': 'Finland', 'FRA': 'France', 'DEU': 'Germany', 
-    'GRC': 'Greece', 'HUN': 'Hungary', 'ISL': 'Iceland', 'IRL': 'Ireland', 
-    'ISR': 'Israel', 'ITA': 'Italy', 'JPN': 'Japan', 'KOR': 'Korea', 
-    'LVA': 'Latvia', 'LTU': 'Lithuania', 'LUX': 'Luxembourg', 'MEX': 'Mexico', 
-    'NLD': 'Netherlands', 'NZL': 'New Zealand', 'NOR': 'Norway', 'POL': 'Poland', 
-    'PRT': 'Portugal', 'SVK': 'Slovak Republic', 'SVN': 'Slovenia', 'ESP': 'Spain', 
-    'SWE': 'Sweden', 'CHE': 'Switzerland', 'TUR': 'Turkey', 'GBR': 'United Kingdom', 
-    'USA': 'United States', 'BRA': 'Brazil', 'RUS': 'Russia',
-    'SGP': 'Singapore', 'CHN': 'China', 'HKG': 'Hong Kong', 'MAC': 'Macao',
-    'QAT': 'Qatar', 'ARE': 'United Arab Emirates', 'CRI': 'Costa Rica', 'BGR': 'Bulgaria'
-}
-
-# Create a display version of the dataframe with country names for display
-display_df = df.copy()
-display_df['location_name'] = display_df['location'].map(lambda x: country_codes.get(x, x))
-
-# Sidebar filters (Bonus feature)
-locations = sorted(df['location'].unique())
-indicators = sorted(df['indicator'].unique())
-subjects = sorted(df['subject'].unique())
-years = sorted(df['time_period'].unique())
-
-# Map indicators to more readable names
-indicator_names = {
-    'PISAMATH': 'Mathematics',
-    'PISAREAD': 'Reading',
-    'PISASCIENCE': 'Science'
-}
-
-# Map subjects to more readable names
-subject_names = {
-    'BOY': 'Boys',
-    'GIRL': 'Girls',
-    'TOT': 'All Students'
-}
+with profiler.span("data load"):
+    index = load_data(get_filter_index, DATA_FILE.name)
+
+# Sidebar filters (Bonus feature), options come prebuilt from the filter index
+locations = index.options('location')
+indicators = index.options('indicator')
+subjects = index.options('subject')
+years = index.options('time_period')
 
 selected_locations = st.sidebar.multiselect(
     "Select Countries",
@@ -110,77 +72,106 @@ selected_years = st.sidebar.multiselect(
     default=years,  # Default to all years
 )
 
-# Filter data based on selections (Bonus feature)
-filtered_df = df.copy()
-display_filtered_df = display_df.copy()
-
-if selected_locations:
-    filtered_df = filtered_df[filtered_df['location'].isin(selected_locations)]
-    display_filtered_df = display_filtered_df[display_filtered_df['location'].isin(selected_locations)]
-if selected_indicators:
-    filtered_df = filtered_df[filtered_df['indicator'].isin(selected_indicators)]
-    display_filtered_df = display_filtered_df[display_filtered_df['indicator'].isin(selected_indicators)]
-if selected_subjects:
-    filtered_df = filtered_df[filtered_df['subject'].isin(selected_subjects)]
-    display_filtered_df = display_filtered_df[display_filtered_df['subject'].isin(selected_subjects)]
-if selected_years:
-    filtered_df = filtered_df[filtered_df['time_period'].isin(selected_years)]
-    display_filtered_df = display_filtered_df[display_filtered_df['time_period'].isin(selected_years)]
+project_trends = st.sidebar.toggle("Project trends", value=True,
+                                   help="Overlay linear trends when one gender is selected")
+
+# Filter data based on selections (Bonus feature). The index resolves all four
+# selections to row positions at once, empty selections are not filtered on
+selection = dict(
+    location=selected_locations,
+    indicator=selected_indicators,
+    subject=selected_subjects,
+    time_period=selected_years
+)
+
+# Filtered on first use only: cached figures and a closed sample table never
+# need the rows, the cost shows in the span of whatever asked first
+@functools.cache
+def filtered_df():
+    return index.filter(**selection)
 
 # --- Dashboard components ---
 # Title
 st.title("PISA Scores Dashboard")
 st.markdown("### Programme for International Student Assessment")
+if not sql_backend_enabled():
+    # A newer file is loaded in the background, this version is served meanwhile
+    st.caption(data_caption())
 st.markdown("---")
 
 # Basic statistics of the data (Required feature #1)
 st.markdown("## Basic Statistics")
 cols = st.columns(4)
 
-with cols[0]:
-    st.metric(label="Total Records", value=len(df))
-with cols[1]:
-    st.metric(label="Locations", value=df['location'].nunique())
-with cols[2]:
-    st.metric(label="Subjects", value=df['indicator'].nunique())
-with cols[3]:
-    st.metric(label="Time Periods", value=df['time_period'].nunique())
-
-# Show a table with sample data (Required feature #2)
-with st.expander("Show Sample Data", expanded=False):
-    # Create a more readable version of the data for display
-    display_data = display_filtered_df.copy()
-    display_data['indicator'] = display_data['indicator'].map(lambda x: indicator_names.get(x, x))
-    display_data['subject'] = display_data['subject'].map(lambda x: subject_names.get(x, x))
-    display_cols = ['location_name', 'indicator', 'subject', 'time_period', 'value']
-    st.dataframe(display_data[display_cols], hide_index=True, 
-                column_config={
-                    "location_name": "Country",
-                    "indicator": "Subject Area",
-                    "subject": "Gender",
-                    "time_period": "Year",
-                    "value": "PISA Score"
-                })
+with profiler.span("kpis"):
+    with cols[0]:
+        st.metric(label="Total Records", value=len(index))
+    with cols[1]:
+        st.metric(label="Locations", value=len(locations))
+    with cols[2]:
+        st.metric(label="Subjects", value=len(indicators))
+    with cols[3]:
+        st.metric(label="Time Periods", value=len(years))
+
+# Show a table with sample data (Required feature #2). Its contents only
+# run while it is open, a closed table does not filter the data.
+sample = st.expander("Show Sample Data", expanded=False, on_change="rerun")
+with sample, profiler.span("sample data"):
+    if sample.open:
+        # Display names are already columns, no per-row mapping needed
+        display_cols = ['location_name', 'indicator_name', 'subject_name', 'time_period', 'value']
+        if sql_backend_enabled():
+            sample_df = filtered_df().head(SAMPLE_ROWS)
+        else:
+            sample_df = filtered_df()
+        st.dataframe(sample_df[display_cols], hide_index=True,
+                    column_config={
+                        "location_name": "Country",
+                        "indicator_name": "Subject Area",
+                        "subject_name": "Gender",
+                        "time_period": "Year",
+                        "value": st.column_config.NumberColumn("PISA Score", format="%.1f")
+                    })
+        if sql_backend_enabled():
+            st.caption(f"First {SAMPLE_ROWS:,} rows. Database file: {index.size() / 1024 ** 2:,.2f} MB")
+        else:
+            st.caption(f"Dataset in memory: {memory_footprint(index.df) / 1024 ** 2:,.2f} MB")
 
 # Bar chart showing average PISA scores by location (Required feature #3)
 st.markdown("## Average PISA Scores by Country")
-scores_by_location_bar(filtered_df, country_codes)
+with profiler.span("scores_by_location_bar"):
+    scores_by_location_bar(
+        filtered_df, country_codes,
+        cache_key=selection_key('scores_by_location', index.version, **selection)
+    )
 
 # Plot trends that can be filtered for each country (Required feature #4)
 st.markdown("## PISA Score Trends Over Time")
-score_trends_by_location(filtered_df, selected_locations, country_codes)
-
-# Additional visualizations
-if len(selected_indicators) > 1:
-    indicator_for_dist = st.selectbox(
-        "Select subject for score distribution:",
-        options=selected_indicators,
-        format_func=lambda x: indicator_names.get(x, x)
+with profiler.span("score_trends_by_location"):
+    # Trends are fitted per gender, so they are drawn for a single one
+    projected = project_trends and len(selected_subjects) == 1
+    score_trends_by_location(
+        filtered_df, selected_locations, country_codes,
+        cache_key=selection_key('score_trends', index.version, projected=projected, **selection),
+        projections=(lambda: trend_projections(selected_locations, selected_indicators, selected_subjects[0]))
+                    if projected else None
     )
-    dist_df = filtered_df[filtered_df['indicator'] == indicator_for_dist]
-else:
-    dist_df = filtered_df
 
-st.markdown("## Score Distribution")
-score_distribution_histogram(dist_df)
+# Countries ranked by their score trend over all assessments, one subject and gender at a time
+st.markdown("## Fastest Improving and Declining Countries")
+with profiler.span("trend_ranking_section"):
+    trend_ranking_section(indicators, subjects)
+
+# Additional visualizations. The subject selectbox only feeds the histogram,
+# so the section is a fragment and the selectbox does not rerun the page.
+with profiler.span("score_distribution_section"):
+    score_distribution_section(index, selection, indicator_names)
+
+# Shared figure cache statistics
+cache_stats = figure_cache.stats()
+st.sidebar.caption(
+    f"Figure cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+    f"{cache_stats['bytes'] / 1024 ** 2:.1f} of {cache_stats['max_bytes'] / 1024 ** 2:.0f} MB"
+)
 
+profiler.finish()
@@ -0,0 +1,121 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+
+# Memory budget for cached figures, override with PISA_FIGURE_CACHE_MB
+DEFAULT_BUDGET_MB = float(os.environ.get('PISA_FIGURE_CACHE_MB', 64))
+
+def selection_key(chart, version, **selection):
+    """
+    Stable hash of a chart name, data version and filter selection.
+
+    List selections are sorted so the same set of countries picked in a
+    different order maps to the same key.
+    """
+    normalized = {
+        name: sorted(map(str, value)) if isinstance(value, (list, tuple, set)) else str(value)
+        for name, value in selection.items()
+    }
+    payload = json.dumps([chart, list(version), normalized], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+# Rough bytes of a figure's layout and template, and of one trace's
+# objects, on top of their data arrays
+FIGURE_OVERHEAD = 16 * 1024
+TRACE_OVERHEAD = 1024
+
+def _data_size(value):
+    """Approximate bytes of one trace property: its arrays, lists and strings"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_data_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        # A pointer per item, the values of a list of numbers are shared
+        return 8 * len(value) + sum(_data_size(item) for item in value if isinstance(item, (str, dict, list, tuple)))
+    if isinstance(value, str):
+        return len(value)
+    return 0
+
+def figure_size(value):
+    """
+    Approximate memory held by a figure, or a list/tuple containing figures, in bytes.
+
+    Estimated from the traces' arrays rather than by serialising the
+    figure, which would cost about as much as building it.
+    """
+    if isinstance(value, (list, tuple)):
+        return sum(figure_size(item) for item in value)
+    if hasattr(value, 'data') and hasattr(value, 'layout'):
+        return FIGURE_OVERHEAD + sum(
+            # _props holds the values as set, to_plotly_json() would copy them
+            TRACE_OVERHEAD + _data_size(getattr(trace, '_props', None) or {})
+            for trace in value.data
+        )
+    return 0
+
+class FigureCache:
+    """
+    Process-wide LRU cache of built Plotly figures.
+
+    Shared by every session. The least recently used figures are evicted
+    once the total size exceeds the budget. Cached figures are shared, so
+    callers must not modify them.
+    """
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.max_bytes = int(budget_mb * 1024 ** 2)
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """Return the cached value for key, building and storing it on a miss"""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+
+        # Build outside the lock so other sessions are not blocked
+        value = build()
+        size = figure_size(value)
+
+        with self.lock:
+            if key not in self.entries and size <= self.max_bytes:
+                self.entries[key] = (value, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, evicted) = self.entries.popitem(last=False)
+                    self.bytes -= evicted
+        return value
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+# One cache per process
+figure_cache = FigureCache()
+
+def cached_figure(key, build):
+    """Build through the shared cache, or directly when no key is given"""
+    if key is None:
+        return build()
+    return figure_cache.get_or_build(key, build)
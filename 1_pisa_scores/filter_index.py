@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from read_data import derived
+from common.refresher import FRAME, VERSION
+from common.sqlstore import sql_backend_enabled
+
+# Sidebar filter dimensions
+DIMENSIONS = ['location', 'indicator', 'subject', 'time_period']
+
+class FilterIndex:
+    """
+    Row index over the sidebar filter dimensions, built once per data version.
+
+    Every dimension is stored as integer codes plus the row positions grouped
+    by code (rows[offsets[c]:offsets[c + 1]] are the rows with value c). A
+    selection starts from the rows of its most selective dimension and checks
+    the other dimensions through their codes, so the cost follows the size
+    of the selection rather than the size of the table.
+    """
+
+    def __init__(self, df, version=None):
+        self.df = df.reset_index(drop=True)
+        self.version = version
+        self.codes = {}
+        self.values = {}
+        self.rows = {}
+        self.offsets = {}
+        for dim in DIMENSIONS:
+            codes, uniques = pd.factorize(self.df[dim], sort=True)
+            self.codes[dim] = codes
+            self.values[dim] = uniques.tolist()
+            self.rows[dim] = np.argsort(codes, kind='stable')
+            # Rows with a missing value (code -1) sort first and are skipped
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            missing = len(codes) - counts.sum()
+            self.offsets[dim] = missing + np.concatenate(([0], np.cumsum(counts)))
+
+    def __len__(self):
+        return len(self.df)
+
+    def options(self, dim):
+        """Sorted distinct values of a dimension"""
+        return self.values[dim]
+
+    def _selected_codes(self, dim, selected):
+        lookup = {value: code for code, value in enumerate(self.values[dim])}
+        return np.array([lookup[v] for v in selected if v in lookup], dtype='int64')
+
+    def select(self, **selections):
+        """
+        Row positions (in table order) matching every non-empty selection.
+
+        An empty or missing selection leaves that dimension unfiltered.
+        """
+        active = {dim: self._selected_codes(dim, sel) for dim, sel in selections.items() if sel}
+        if not active:
+            return np.arange(len(self.df))
+
+        # Start from the dimension that selects the fewest rows
+        sizes = {
+            dim: int((self.offsets[dim][codes + 1] - self.offsets[dim][codes]).sum())
+            for dim, codes in active.items()
+        }
+        first = min(sizes, key=sizes.get)
+        offsets = self.offsets[first]
+        rows = np.concatenate(
+            [self.rows[first][offsets[c]:offsets[c + 1]] for c in active[first]]
+            or [np.empty(0, dtype='int64')]
+        )
+
+        for dim, codes in active.items():
+            if dim == first:
+                continue
+            allowed = np.zeros(len(self.values[dim]), dtype=bool)
+            allowed[codes] = True
+            dim_codes = self.codes[dim][rows]
+            rows = rows[(dim_codes >= 0) & allowed[dim_codes]]
+
+        return np.sort(rows)
+
+    def filter(self, **selections):
+        """The matching rows as a single DataFrame"""
+        return self.df.take(self.select(**selections))
+
+def get_filter_index():
+    """Filter index for the current data, rebuilt only when the CSV changes"""
+    if sql_backend_enabled():
+        # Filters run inside the database, the frame is never loaded
+        from sql_backend import get_filter_index as get_sql_filter_index
+        return get_sql_filter_index()
+    return derived(FilterIndex, FRAME, VERSION)
@@ -1,70 +1,160 @@
+import numpy as np
 import pandas as pd
 from read_data import read_data
+from cube import get_cube
+from common.sqlstore import sql_backend_enabled
 
-df = read_data()
 # Calculate basic statistics about the dataset
-total_records = len(df)
-total_location = df['location'].nunique()
-total_subjects = df['indicator'].nunique()
-total_time_periods = df['time_period'].nunique()
+def dataset_totals():
+    """(records, locations, indicators, time periods) of the served data"""
+    if sql_backend_enabled():
+        from sql_backend import dataset_totals as sql_dataset_totals
+        return sql_dataset_totals()
+    df = read_data()
+    return len(df), df['location'].nunique(), df['indicator'].nunique(), df['time_period'].nunique()
+
+# Define helper functions for specific analysis. They slice the precomputed
+# score cube (see cube.py) instead of masking and merging the full frame, or
+# with the SQL backend run the same queries inside the database.
+
+def _year_position(cube, year):
+    return cube.position('time_period', year)
 
-# Define helper functions for specific analysis.
 # Identify the top performing countries for a specific subject area, gender group, and year
 def get_top_countries(n=5, indicator='PISAMATH', subject='TOT', year=2018):
-    # Filter data based on the specified criteria
-    filtered = df[(df['indicator'] == indicator) & 
-                  (df['subject'] == subject) & 
-                  (df['time_period'] == year)]
-    
-    return filtered.sort_values('value', ascending=False).head(n)
+    if sql_backend_enabled():
+        from sql_backend import get_top_countries as sql_get_top_countries
+        return sql_get_top_countries(n, indicator, subject, year)
+    cube = get_cube()
+    scores = cube.series(indicator, subject)
+    y = _year_position(cube, year)
+    if scores is None or y is None:
+        return pd.DataFrame(columns=['location', 'indicator', 'subject', 'time_period', 'value'])
+
+    column = scores[:, y]
+    present = np.flatnonzero(~np.isnan(column))
+    top = present[np.argsort(-column[present], kind='stable')][:n]
+
+    return pd.DataFrame({
+        'location': cube.locations[top],
+        'indicator': indicator,
+        'subject': subject,
+        'time_period': year,
+        'value': column[top]
+    })
 
 # Calculate which countries have shown the most improvement between two assessment years.
 def get_most_improved(indicator='PISAMATH', subject='TOT', start_year=2003, end_year=2018):
-    
-    # Get data for the starting year with specified criteria
-    start_df = df[(df['indicator'] == indicator) & 
-                 (df['subject'] == subject) & 
-                 (df['time_period'] == start_year)]
-    
-    # Get data for the ending year with specified criteria
-    end_df = df[(df['indicator'] == indicator) & 
-               (df['subject'] == subject) & 
-               (df['time_period'] == end_year)]
-    
-    # Merge on location
-    merged = pd.merge(start_df, end_df, on='location', suffixes=('_start', '_end'))
-    
-    # Calculate difference
+    if sql_backend_enabled():
+        from sql_backend import get_most_improved as sql_get_most_improved
+        return sql_get_most_improved(indicator, subject, start_year, end_year)
+    cube = get_cube()
+    scores = cube.series(indicator, subject)
+    start, end = _year_position(cube, start_year), _year_position(cube, end_year)
+    if scores is None or start is None or end is None:
+        return pd.DataFrame(columns=['location', 'value_start', 'value_end', 'improvement'])
+
+    # Difference between the two year columns, for every location at once
+    merged = pd.DataFrame({
+        'location': cube.locations,
+        'value_start': scores[:, start],
+        'value_end': scores[:, end],
+    })
     merged['improvement'] = merged['value_end'] - merged['value_start']
-    
-    return merged.sort_values('improvement', ascending=False)
+
+    return merged.dropna().sort_values('improvement', ascending=False)
 
 def get_gender_gap(indicator='PISAMATH', year=2018):
-    
-    # Get data for boys in the specified subject and year
-    boys = df[(df['indicator'] == indicator) & 
-             (df['subject'] == 'BOY') & 
-             (df['time_period'] == year)]
-    
-    # Get data for girls in the specified subject and year
-    girls = df[(df['indicator'] == indicator) & 
-              (df['subject'] == 'GIRL') & 
-              (df['time_period'] == year)]
-    
-    # Merge on location
-    merged = pd.merge(boys, girls, on='location', suffixes=('_boys', '_girls'))
-    
+    if sql_backend_enabled():
+        from sql_backend import get_gender_gap as sql_get_gender_gap
+        return sql_get_gender_gap(indicator, year)
+    cube = get_cube()
+    boys, girls = cube.series(indicator, 'BOY'), cube.series(indicator, 'GIRL')
+    y = _year_position(cube, year)
+    if boys is None or girls is None or y is None:
+        return pd.DataFrame(columns=['location', 'value_boys', 'value_girls', 'gap'])
+
+    merged = pd.DataFrame({
+        'location': cube.locations,
+        'value_boys': boys[:, y],
+        'value_girls': girls[:, y],
+    })
     # Calculate gap (positive means boys score higher)
     merged['gap'] = merged['value_boys'] - merged['value_girls']
-    
-    return merged.sort_values('gap', ascending=False)
+
+    return merged.dropna().sort_values('gap', ascending=False)
+
+# Improvement between every pair of assessment years for every country.
+def get_all_improvements(indicator='PISAMATH', subject='TOT'):
+    """Long table of (location, start_year, end_year, improvement) for all start < end"""
+    if sql_backend_enabled():
+        from sql_backend import get_all_improvements as sql_get_all_improvements
+        return sql_get_all_improvements(indicator, subject)
+    cube = get_cube()
+    scores = cube.series(indicator, subject)
+    if scores is None:
+        return pd.DataFrame(columns=['location', 'start_year', 'end_year', 'improvement'])
+
+    # (location, start, end) differences by broadcasting
+    diff = scores[:, None, :] - scores[:, :, None]
+    loc, start, end = np.nonzero(np.triu(~np.isnan(diff), k=1))
+
+    return pd.DataFrame({
+        'location': cube.locations[loc],
+        'start_year': cube.years[start],
+        'end_year': cube.years[end],
+        'improvement': diff[loc, start, end]
+    })
+
+# Gender gap for every country and assessment year.
+def get_gender_gap_trend(indicator='PISAMATH'):
+    """Boys minus girls score as a location x year table (NaN where missing)"""
+    if sql_backend_enabled():
+        from sql_backend import get_gender_gap_trend as sql_get_gender_gap_trend
+        return sql_get_gender_gap_trend(indicator)
+    cube = get_cube()
+    boys, girls = cube.series(indicator, 'BOY'), cube.series(indicator, 'GIRL')
+    if boys is None or girls is None:
+        return pd.DataFrame()
+
+    return pd.DataFrame(boys - girls, index=cube.locations, columns=cube.years)
+
+# Rank of every country for each subject area and year.
+def get_rankings(subject='TOT'):
+    """Long table of (location, indicator, time_period, value, rank) for every scored cell"""
+    if sql_backend_enabled():
+        from sql_backend import get_rankings as sql_get_rankings
+        return sql_get_rankings(subject)
+    cube = get_cube()
+    s = cube.position('subject', subject)
+    if s is None:
+        return pd.DataFrame(columns=['location', 'indicator', 'time_period', 'value', 'rank'])
+
+    ranks = cube.rankings(subject)
+    loc, ind, year = np.nonzero(~np.isnan(ranks))
+
+    return pd.DataFrame({
+        'location': cube.locations[loc],
+        'indicator': np.array(cube.labels['indicator'], dtype=object)[ind],
+        'time_period': cube.years[year],
+        'value': cube.values[loc, ind, s, year],
+        'rank': ranks[loc, ind, year].astype('int64')
+    })
 
 # Calculate global average PISA scores for each subject area by year.
 def get_global_average_by_year():
     """Get global average scores by year across all indicators"""
-    return df[df['subject'] == 'TOT'].groupby(['time_period', 'indicator'])['value'].mean().reset_index()
+    if sql_backend_enabled():
+        from sql_backend import get_global_average_by_year as sql_get_global_average_by_year
+        return sql_get_global_average_by_year()
+    df = read_data()
+    return df[df['subject'] == 'TOT'].groupby(['time_period', 'indicator'], observed=True)['value'].mean().reset_index()
 
 # Calculate overall average PISA scores for each subject area across all years.
 def get_average_by_indicator():
     """Get average scores by indicator across all years"""
-    return df[df['subject'] == 'TOT'].groupby('indicator')['value'].mean().reset_index()
+    if sql_backend_enabled():
+        from sql_backend import get_average_by_indicator as sql_get_average_by_indicator
+        return sql_get_average_by_indicator()
+    df = read_data()
+    return df[df['subject'] == 'TOT'].groupby('indicator', observed=True)['value'].mean().reset_index()
@@ -0,0 +1,31 @@
+# Display names for the PISA codes, applied once to the categories at load
+
+# Define mappings for country codes to names (for better readability)
+country_codes = {
+    'AUS': 'Australia', 'AUT': 'Austria', 'BEL': 'Belgium', 'CAN': 'Canada', 
+    'CHL': 'Chile', 'COL': 'Colombia', 'CZE': 'Czech Republic', 'DNK': 'Denmark', 
+    'EST': 'Estonia', 'FIN': 'Finland', 'FRA': 'France', 'DEU': 'Germany', 
+    'GRC': 'Greece', 'HUN': 'Hungary', 'ISL': 'Iceland', 'IRL': 'Ireland', 
+    'ISR': 'Israel', 'ITA': 'Italy', 'JPN': 'Japan', 'KOR': 'Korea', 
+    'LVA': 'Latvia', 'LTU': 'Lithuania', 'LUX': 'Luxembourg', 'MEX': 'Mexico', 
+    'NLD': 'Netherlands', 'NZL': 'New Zealand', 'NOR': 'Norway', 'POL': 'Poland', 
+    'PRT': 'Portugal', 'SVK': 'Slovak Republic', 'SVN': 'Slovenia', 'ESP': 'Spain', 
+    'SWE': 'Sweden', 'CHE': 'Switzerland', 'TUR': 'Turkey', 'GBR': 'United Kingdom', 
+    'USA': 'United States', 'BRA': 'Brazil', 'RUS': 'Russia',
+    'SGP': 'Singapore', 'CHN': 'China', 'HKG': 'Hong Kong', 'MAC': 'Macao',
+    'QAT': 'Qatar', 'ARE': 'United Arab Emirates', 'CRI': 'Costa Rica', 'BGR': 'Bulgaria'
+}
+
+# Map indicators to more readable names
+indicator_names = {
+    'PISAMATH': 'Mathematics',
+    'PISAREAD': 'Reading',
+    'PISASCIENCE': 'Science'
+}
+
+# Map subjects to more readable names
+subject_names = {
+    'BOY': 'Boys',
+    'GIRL': 'Girls',
+    'TOT': 'All Students'
+}
@@ -1,14 +1,35 @@
 import pandas as pd
 from pathlib import Path
+from labels import country_codes, indicator_names, subject_names
+from common.columnar_cache import load_columnar
+from common.ingest import read_csv, log_progress
+from common.refresher import data_source
+
+DATA_FILE = Path(__file__).parent / "data" / "OECD PISA data.csv"
+
+# Compact schema applied while parsing. The unused 'index' column is never read.
+COLUMN_TYPES = {
+    'LOCATION': 'category',
+    'INDICATOR': 'category',
+    'SUBJECT': 'category',
+    'TIME': 'int16',
+    'Value': 'float32'
+}
+
+# Display-name columns derived from the code categories
+DISPLAY_NAMES = {
+    'location': ('location_name', country_codes),
+    'indicator': ('indicator_name', indicator_names),
+    'subject': ('subject_name', subject_names)
+}
+
+def file_version(path=DATA_FILE):
+    """Return (mtime_ns, size) of the data file, used to detect changes"""
+    stat = Path(path).stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+def prepare(df):
 
-def read_data():
-    
-    data_path = Path(__file__).parent / "data"
-    
-    data_path.mkdir(exist_ok=True, parents=True)
-    
-    df = pd.read_csv(data_path / "OECD PISA data.csv")
-    
     # Rename columns to match my dashboard
     column_mapping = {
         'LOCATION': 'location',
@@ -18,28 +39,91 @@ def read_data():
         'INDICATOR': 'indicator'
     }
     df = df.rename(columns=column_mapping)
-    
+
     expected_columns = ['location','subject', 'time_period', 'value', 'indicator']
     missing_columns = [col for col in expected_columns if col not in df.columns]
-    
+
     if missing_columns:
         print(f"Warning: Missing expected columns: {', '.join(missing_columns)}")
-        
-    if 'value' in df.columns:
-        df['value'] = pd.to_numeric(df['value'], errors='coerce')
-        
+
+    if 'value' in df.columns and df['value'].dtype != 'float32':
+        df['value'] = pd.to_numeric(df['value'], errors='coerce').astype('float32')
+
+    # Names are applied to the (few) categories, the row codes are shared
+    for col, (name_col, names) in DISPLAY_NAMES.items():
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+            df[name_col] = df[col].cat.rename_categories(lambda code: names.get(code, code))
+
     return df
 
+def parse_csv(path=DATA_FILE):
+    """Parse the CSV in parallel chunks straight into the compact schema"""
+    return read_csv(path, usecols=list(COLUMN_TYPES), dtype=COLUMN_TYPES,
+                    progress=log_progress(Path(path).name))
+
+def parse_csv_chunks(path=DATA_FILE, chunksize=100_000):
+    """Parse the CSV a chunk at a time into the compact, renamed schema"""
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [col for col in header if col in COLUMN_TYPES]
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=COLUMN_TYPES, chunksize=chunksize):
+        yield prepare(chunk)
+
+def memory_footprint(df):
+    """Bytes held by the frame, including category labels"""
+    return int(df.memory_usage(deep=True).sum())
+
+def load_frame():
+    """Memory-mapped from the columnar cache, parsed only when the CSV is new"""
+    return load_columnar(DATA_FILE, lambda: prepare(parse_csv()), schema=COLUMN_TYPES)
+
+# Process-wide data shared by every Streamlit session, refreshed in the background
+source = data_source(DATA_FILE, load_frame, file_version)
+
+def read_data_versioned():
+    """Return (frame, version) of the served data, loading it on first use"""
+    DATA_FILE.parent.mkdir(exist_ok=True, parents=True)
+    snapshot = source.current()
+    return snapshot.frame, snapshot.version
+
+def derived(build, *inputs):
+    """
+    build(frame) for the served data, shared by every session and rebuilt in
+    the background with every new version. See DataSource.derived for inputs.
+    """
+    return source.derived(build, *inputs)
+
+def data_caption():
+    """'Data as of ...' line for the dashboard"""
+    return source.caption()
+
+def read_data():
+    """
+    Return the PISA data as one shared, read-only DataFrame.
+
+    The frame is loaded once per process. When the file's mtime or size
+    changes it is reloaded on a background thread and swapped in, the
+    previous frame is served until then. Its columns are memory-mapped from
+    the columnar cache next to the CSV, shared by every worker process.
+    Callers must not modify the returned frame.
+    """
+    return read_data_versioned()[0]
+
+def data_version():
+    """Version of the data currently returned by read_data()"""
+    return read_data_versioned()[1]
+
 if __name__ == '__main__':
     df = read_data()
-    
+
     print(df.columns)
-    
+
     print("\nFirst 5 rows")
     print(df.head())
-    
+
     print("\nStatistics")
     print(f"Total records: {len(df)}")
     print(f"Unique locations: {df['location'].nunique()}")
     print(f"Unique subjects: {df['subject'].nunique()}")
-    print(f"Time periods: {df['time_period'].nunique()}")
\ No newline at end of file
+    print(f"Time periods: {df['time_period'].nunique()}")
+    print(f"Memory footprint: {memory_footprint(df) / 1024:,.1f} KiB")
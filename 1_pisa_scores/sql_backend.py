@@ -0,0 +1,228 @@
+import threading
+import pandas as pd
+from read_data import DATA_FILE, DISPLAY_NAMES, parse_csv_chunks
+from cube import ScoreCube
+from trends import TrendFits
+from common.sqlstore import SqlStore, placeholders
+
+DIMENSIONS = ['location', 'indicator', 'subject', 'time_period']
+
+COLUMNS = {
+    'location': 'TEXT',
+    'indicator': 'TEXT',
+    'subject': 'TEXT',
+    'time_period': 'INTEGER',
+    'value': 'REAL',
+}
+
+store = SqlStore(
+    DATA_FILE, 'pisa', COLUMNS, parse_csv_chunks,
+    # Covering index for the per-indicator KPI queries, plus one per filter
+    indexes=[
+        ('indicator', 'subject', 'time_period', 'location', 'value'),
+        ('location',),
+    ]
+)
+
+# Index cache shared by every session: (version, SqlFilterIndex)
+_cache = {}
+# Trend fits shared by every session: (version, TrendFits)
+_trend_cache = {}
+_lock = threading.Lock()
+
+def where_clause(selections):
+    """WHERE clause and parameters for the non-empty selections"""
+    clauses, params = [], []
+    for dim, selected in selections.items():
+        if selected:
+            clauses.append(f'{dim} IN ({placeholders(selected)})')
+            params.extend(selected)
+    return ' AND '.join(clauses) or '1', params
+
+class SqlSelection:
+    """
+    Rows matching the sidebar filters, kept in the database.
+
+    Only the aggregates the charts ask for are fetched.
+    """
+
+    def __init__(self, selections):
+        self.where, self.params = where_clause(selections)
+
+    def location_averages(self):
+        return store.query(f'''
+            SELECT location, AVG(value) AS value FROM pisa WHERE {self.where}
+            GROUP BY location HAVING COUNT(value) > 0 ORDER BY location
+        ''', self.params)
+
+    def trend_averages(self):
+        return store.query(f'''
+            SELECT location, time_period, indicator, AVG(value) AS value FROM pisa WHERE {self.where}
+            GROUP BY location, time_period, indicator HAVING COUNT(value) > 0
+            ORDER BY location, time_period, indicator
+        ''', self.params)
+
+    def values(self):
+        """The score column alone, for the distribution histogram"""
+        return store.query(f'SELECT value FROM pisa WHERE {self.where}', self.params)
+
+    def head(self, n):
+        """First n matching rows with the same display-name columns as the frame"""
+        rows = store.query(f'SELECT * FROM pisa WHERE {self.where} LIMIT ?', self.params + [n])
+        for col, (name_col, names) in DISPLAY_NAMES.items():
+            rows[name_col] = rows[col].map(lambda code: names.get(code, code))
+        return rows
+
+class SqlFilterIndex:
+    """Same options()/filter() interface as filter_index.FilterIndex, served by the database"""
+
+    def __init__(self, version):
+        self.version = version
+        self.values = {
+            dim: store.query(
+                f'SELECT DISTINCT {dim} FROM pisa WHERE {dim} IS NOT NULL ORDER BY {dim}'
+            )[dim].tolist()
+            for dim in DIMENSIONS
+        }
+        self.rows = store.scalar('SELECT COUNT(*) FROM pisa')
+
+    def __len__(self):
+        return self.rows
+
+    def options(self, dim):
+        return self.values[dim]
+
+    def filter(self, **selections):
+        return SqlSelection(selections)
+
+    def size(self):
+        """Bytes used by the database file"""
+        return store.size()
+
+def get_filter_index():
+    """Filter index for the current database, rebuilt only when the CSV changes"""
+    version = store.ensure()
+    with _lock:
+        if _cache.get('version') != version:
+            _cache['index'] = SqlFilterIndex(version)
+            _cache['version'] = version
+        return _cache['index']
+
+def get_trends():
+    """Trend fits of the database's averaged scores, refit only when the CSV changes"""
+    version = store.ensure()
+    with _lock:
+        if _trend_cache.get('version') != version:
+            # One row per location, indicator, subject and year, the fit itself runs in NumPy
+            cells = store.query('''
+                SELECT location, indicator, subject, time_period, AVG(value) AS value FROM pisa
+                WHERE value IS NOT NULL GROUP BY location, indicator, subject, time_period
+            ''')
+            _trend_cache['trends'] = TrendFits(ScoreCube(cells))
+            _trend_cache['version'] = version
+        return _trend_cache['trends']
+
+# The queries in kpis.py, run inside the database. Duplicate rows for one
+# location, indicator, subject and year are averaged, as in the score cube.
+
+def dataset_totals():
+    """(records, locations, indicators, time periods)"""
+    totals = store.query('''
+        SELECT COUNT(*), COUNT(DISTINCT location), COUNT(DISTINCT indicator), COUNT(DISTINCT time_period)
+        FROM pisa
+    ''')
+    return tuple(int(v) for v in totals.iloc[0])
+
+def get_top_countries(n=5, indicator='PISAMATH', subject='TOT', year=2018):
+    top = store.query('''
+        SELECT location, AVG(value) AS value FROM pisa
+        WHERE indicator = ? AND subject = ? AND time_period = ? AND value IS NOT NULL
+        GROUP BY location ORDER BY value DESC, location LIMIT ?
+    ''', (indicator, subject, year, n))
+    top.insert(1, 'indicator', indicator)
+    top.insert(2, 'subject', subject)
+    top.insert(3, 'time_period', year)
+    return top
+
+def get_most_improved(indicator='PISAMATH', subject='TOT', start_year=2003, end_year=2018):
+    return store.query('''
+        WITH cells AS (
+            SELECT location, time_period, AVG(value) AS value FROM pisa
+            WHERE indicator = ? AND subject = ? AND time_period IN (?, ?) AND value IS NOT NULL
+            GROUP BY location, time_period
+        )
+        SELECT s.location, s.value AS value_start, e.value AS value_end,
+               e.value - s.value AS improvement
+        FROM cells s JOIN cells e ON e.location = s.location
+        WHERE s.time_period = ? AND e.time_period = ?
+        ORDER BY improvement DESC, s.location
+    ''', (indicator, subject, start_year, end_year, start_year, end_year))
+
+def get_gender_gap(indicator='PISAMATH', year=2018):
+    return store.query('''
+        SELECT location, value_boys, value_girls, value_boys - value_girls AS gap
+        FROM (
+            SELECT location,
+                   AVG(CASE WHEN subject = 'BOY' THEN value END) AS value_boys,
+                   AVG(CASE WHEN subject = 'GIRL' THEN value END) AS value_girls
+            FROM pisa
+            WHERE indicator = ? AND time_period = ? AND subject IN ('BOY', 'GIRL')
+            GROUP BY location
+        )
+        WHERE value_boys IS NOT NULL AND value_girls IS NOT NULL
+        ORDER BY gap DESC, location
+    ''', (indicator, year))
+
+def get_all_improvements(indicator='PISAMATH', subject='TOT'):
+    return store.query('''
+        WITH cells AS (
+            SELECT location, time_period, AVG(value) AS value FROM pisa
+            WHERE indicator = ? AND subject = ? AND value IS NOT NULL
+            GROUP BY location, time_period
+        )
+        SELECT s.location, s.time_period AS start_year, e.time_period AS end_year,
+               e.value - s.value AS improvement
+        FROM cells s JOIN cells e ON e.location = s.location AND e.time_period > s.time_period
+        ORDER BY s.location, start_year, end_year
+    ''', (indicator, subject))
+
+def get_gender_gap_trend(indicator='PISAMATH'):
+    gaps = store.query('''
+        SELECT location, time_period,
+               AVG(CASE WHEN subject = 'BOY' THEN value END)
+               - AVG(CASE WHEN subject = 'GIRL' THEN value END) AS gap
+        FROM pisa WHERE indicator = ? AND subject IN ('BOY', 'GIRL')
+        GROUP BY location, time_period
+    ''', (indicator,))
+    if gaps.empty:
+        return pd.DataFrame()
+    # Every location and year in the data, as in the cube version
+    index = get_filter_index()
+    table = gaps.pivot(index='location', columns='time_period', values='gap')
+    return table.reindex(index=index.options('location'), columns=index.options('time_period'))
+
+def get_rankings(subject='TOT'):
+    return store.query('''
+        WITH cells AS (
+            SELECT location, indicator, time_period, AVG(value) AS value FROM pisa
+            WHERE subject = ? AND value IS NOT NULL
+            GROUP BY location, indicator, time_period
+        )
+        SELECT location, indicator, time_period, value,
+               ROW_NUMBER() OVER (PARTITION BY indicator, time_period ORDER BY value DESC, location) AS rank
+        FROM cells ORDER BY location, indicator, time_period
+    ''', (subject,))
+
+def get_global_average_by_year():
+    return store.query('''
+        SELECT time_period, indicator, AVG(value) AS value FROM pisa
+        WHERE subject = 'TOT' GROUP BY time_period, indicator
+        HAVING COUNT(value) > 0 ORDER BY time_period, indicator
+    ''')
+
+def get_average_by_indicator():
+    return store.query('''
+        SELECT indicator, AVG(value) AS value FROM pisa
+        WHERE subject = 'TOT' GROUP BY indicator
+        HAVING COUNT(value) > 0 ORDER BY indicator
+    ''')
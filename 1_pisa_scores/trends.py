@@ -0,0 +1,247 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from read_data import derived
+from cube import ScoreCube
+from labels import country_codes, indicator_names, subject_names
+from common.sqlstore import sql_backend_enabled
+
+# Fewest assessment waves a series needs to get a trend and its standard error
+MIN_WAVES = 3
+# Future waves projected past the last assessment year
+PROJECTED_WAVES = 2
+
+# Two-sided 5% critical values of Student's t by degrees of freedom. Between
+# tabulated values the next smaller one is used, which errs on the safe side.
+T_DOF = np.array(list(range(1, 31)) + [40, 60, 120, np.inf])
+T_CRITICAL = np.array([
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+    2.021, 2.000, 1.980, 1.960,
+])
+
+TABLE_COLUMNS = ['location', 'waves', 'first_year', 'last_year', 'slope', 'stderr',
+                 't', 'significant', 'latest', 'projected']
+
+def t_critical(dof):
+    """Two-sided 5% critical t value for every degrees of freedom in dof (at least 1)"""
+    return T_CRITICAL[np.searchsorted(T_DOF, dof, side='right') - 1]
+
+class TrendFits:
+    """
+    Least-squares linear trend of every location x indicator x subject series.
+
+    All series are fitted together: the cube's scores become one (series,
+    year) matrix and missing waves get zero weight in the masked sums, so a
+    fit is a few array passes whatever the number of series. Results are
+    (location, indicator, subject) arrays; series with fewer than MIN_WAVES
+    scores have NaN fits.
+    """
+
+    def __init__(self, cube):
+        self.cube = cube
+        shape = cube.values.shape[:3]
+        scores = cube.values.reshape(-1, len(cube.years))
+        observed = ~np.isnan(scores)
+        y = np.where(observed, scores, 0.0)
+        # Years centred on the middle of the data keep the sums well conditioned
+        self.origin = float(cube.years.mean())
+        x = cube.years - self.origin
+
+        waves = observed.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_mean = (observed @ x) / waves
+            y_mean = y.sum(axis=1) / waves
+            sxx = observed @ x ** 2 - waves * x_mean ** 2
+            slope = (y @ x - waves * x_mean * y_mean) / sxx
+            intercept = y_mean - slope * x_mean
+            residuals = np.where(observed, scores - intercept[:, None] - slope[:, None] * x, 0.0)
+            sigma = np.sqrt((residuals ** 2).sum(axis=1) / (waves - 2))
+            stderr = sigma / np.sqrt(sxx)
+            t = slope / stderr
+
+        fitted = waves >= MIN_WAVES
+        for values in (x_mean, sxx, slope, intercept, sigma, stderr, t):
+            values[~fitted] = np.nan
+        self.waves = waves.reshape(shape)
+        self.x_mean = x_mean.reshape(shape)
+        self.sxx = sxx.reshape(shape)
+        self.slope = slope.reshape(shape)
+        self.intercept = intercept.reshape(shape)
+        self.sigma = sigma.reshape(shape)
+        self.stderr = stderr.reshape(shape)
+        self.t = t.reshape(shape)
+        # Perfect fits have an infinite t and count as significant
+        self.critical = np.where(fitted, t_critical(np.maximum(waves - 2, 1)), np.nan).reshape(shape)
+        self.significant = np.abs(self.t) > self.critical
+
+        # Year and score of the first and last wave with a score
+        last = len(cube.years) - 1 - np.argmax(observed[:, ::-1], axis=1)
+        self.first_year = np.where(waves > 0, cube.years[np.argmax(observed, axis=1)], 0).reshape(shape)
+        self.last_year = np.where(waves > 0, cube.years[last], 0).reshape(shape)
+        self.latest = np.where(waves > 0, scores[np.arange(len(scores)), last], np.nan).reshape(shape)
+
+        # The assessment cycle, for the waves to project
+        self.step = int(np.median(np.diff(cube.years))) if len(cube.years) > 1 else 1
+        self.future_years = cube.years[-1] + self.step * np.arange(1, PROJECTED_WAVES + 1)
+
+    def _line(self, rows, i, s, years):
+        """(estimate, lower, upper) of series (rows, i, s) at years, broadcast against rows"""
+        x = np.asarray(years, dtype='float64') - self.origin
+        pick = lambda values: values[rows, i, s][:, None]
+        estimate = pick(self.intercept) + pick(self.slope) * x
+        spread = pick(self.critical) * pick(self.sigma) * np.sqrt(
+            1 / pick(self.waves) + (x - pick(self.x_mean)) ** 2 / pick(self.sxx)
+        )
+        return estimate, estimate - spread, estimate + spread
+
+    def predict(self, years, indicator, subject):
+        """
+        (estimate, lower, upper) trend line of one indicator and subject.
+
+        Arrays are (location, year) for the given years, NaN for locations
+        without a trend; lower and upper bound the 95% confidence interval
+        of the line.
+        """
+        i = self.cube.position('indicator', indicator)
+        s = self.cube.position('subject', subject)
+        if i is None or s is None:
+            empty = np.full((len(self.cube.locations), len(years)), np.nan)
+            return empty, empty, empty
+        return self._line(slice(None), i, s, years)
+
+    def table(self, indicator, subject):
+        """
+        One row per fitted location: waves, first and last year, slope (points
+        per year) with its standard error and t value, whether it is
+        significant at 5%, the latest score and the projection for the next
+        wave.
+        """
+        i = self.cube.position('indicator', indicator)
+        s = self.cube.position('subject', subject)
+        if i is None or s is None:
+            return pd.DataFrame(columns=TABLE_COLUMNS)
+        fitted = np.flatnonzero(~np.isnan(self.slope[:, i, s]))
+        projected, _, _ = self.predict(self.future_years[:1], indicator, subject)
+        return pd.DataFrame({
+            'location': self.cube.locations[fitted],
+            'waves': self.waves[fitted, i, s],
+            'first_year': self.first_year[fitted, i, s],
+            'last_year': self.last_year[fitted, i, s],
+            'slope': self.slope[fitted, i, s],
+            'stderr': self.stderr[fitted, i, s],
+            't': self.t[fitted, i, s],
+            'significant': self.significant[fitted, i, s],
+            'latest': self.latest[fitted, i, s],
+            'projected': projected[fitted, 0],
+        })
+
+    def fastest_changes(self, indicator, subject, n=5, significant_only=False):
+        """(improvers, decliners): the n steepest rising and falling trends, steepest first"""
+        table = self.table(indicator, subject)
+        if significant_only:
+            table = table[table['significant']]
+        improvers = table[table['slope'] > 0].sort_values('slope', ascending=False, kind='stable')
+        decliners = table[table['slope'] < 0].sort_values('slope', kind='stable')
+        return improvers.head(n).reset_index(drop=True), decliners.head(n).reset_index(drop=True)
+
+    def projection_lines(self, locations, indicators, subject):
+        """
+        Long frame of projected trend lines for the chart overlays.
+
+        Every fitted series runs from the trend value at its own last wave
+        with a score through the future waves. Columns are location,
+        indicator, time_period, value, lower and upper.
+        """
+        columns = ['location', 'indicator', 'time_period', 'value', 'lower', 'upper']
+        s = self.cube.position('subject', subject)
+        positions = (self.cube.position('location', location) for location in locations)
+        rows = np.array([p for p in positions if p is not None], dtype='int64')
+        frames = []
+        for indicator in indicators:
+            i = self.cube.position('indicator', indicator)
+            if i is None or s is None:
+                continue
+            fitted = rows[~np.isnan(self.slope[rows, i, s])]
+            # (series, point) years: the last wave, then the projected ones
+            years = np.column_stack([self.last_year[fitted, i, s]] + [
+                np.full(len(fitted), year) for year in self.future_years
+            ])
+            estimate, lower, upper = self._line(fitted, i, s, years)
+            frames.append(pd.DataFrame({
+                'location': np.repeat(self.cube.locations[fitted], years.shape[1]),
+                'indicator': indicator,
+                'time_period': years.ravel(),
+                'value': estimate.ravel(),
+                'lower': lower.ravel(),
+                'upper': upper.ravel(),
+            }))
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)
+
+def get_trends():
+    """Trend fits for the current data, refit only when the CSV changes"""
+    if sql_backend_enabled():
+        from sql_backend import get_trends as sql_get_trends
+        return sql_get_trends()
+    # Fitted to the cube of the same data version
+    return derived(TrendFits, ScoreCube)
+
+def fastest_changes(indicator='PISAMATH', subject='TOT', n=5, significant_only=False):
+    """(improvers, decliners) with the n steepest trends each"""
+    return get_trends().fastest_changes(indicator, subject, n, significant_only)
+
+def trend_projections(locations, indicators, subject='TOT'):
+    """Projected trend lines of the selected countries, for the trend charts"""
+    return get_trends().projection_lines(locations, indicators, subject)
+
+def change_table(changes, next_year):
+    """Display columns of an improvers or decliners frame"""
+    return pd.DataFrame({
+        'Country': changes['location'].map(lambda code: country_codes.get(code, code)),
+        'Points per year': changes['slope'],
+        'Std. error': changes['stderr'],
+        'Waves': changes['waves'],
+        'Years': changes['first_year'].astype(str) + '–' + changes['last_year'].astype(str),
+        'Latest': changes['latest'],
+        f'Projected {next_year}': changes['projected'],
+        'Significant': changes['significant'],
+    })
+
+@st.fragment
+def trend_ranking_section(indicators, subjects):
+    """
+    Fastest improving and declining countries for one subject and gender.
+
+    Runs as a fragment, so its widgets rerun only this section.
+    """
+    trends = get_trends()
+    cols = st.columns([2, 2, 1, 2])
+    with cols[0]:
+        indicator = st.selectbox("Subject area", options=indicators,
+                                 format_func=lambda x: indicator_names.get(x, x))
+    with cols[1]:
+        subject = st.selectbox("Gender", options=subjects, index=subjects.index('TOT') if 'TOT' in subjects else 0,
+                               format_func=lambda x: subject_names.get(x, x))
+    with cols[2]:
+        n = st.number_input("Countries", min_value=1, max_value=20, value=5)
+    with cols[3]:
+        significant_only = st.toggle("Significant trends only")
+
+    improvers, decliners = trends.fastest_changes(indicator, subject, n, significant_only)
+    next_year = int(trends.future_years[0])
+    number = st.column_config.NumberColumn(format="%.1f")
+    config = {name: number for name in ['Points per year', 'Std. error', 'Latest', f'Projected {next_year}']}
+    cols = st.columns(2)
+    with cols[0]:
+        st.markdown("**Fastest improving**")
+        st.dataframe(change_table(improvers, next_year), hide_index=True, column_config=config)
+    with cols[1]:
+        st.markdown("**Fastest declining**")
+        st.dataframe(change_table(decliners, next_year), hide_index=True, column_config=config)
+    st.caption(
+        f"Least-squares trend over every assessment with a score, for countries with at least "
+        f"{MIN_WAVES}. Significant means the slope differs from zero at the 5% level."
+    )
@@ -0,0 +1,63 @@
+import streamlit as st
+from read_data import DATA_FILE, read_data
+from model import get_model, BOOTSTRAP_SAMPLES
+from charts import revenue_model_chart
+from common.pages import load_data
+
+# --- Page configuration ---
+st.set_page_config(
+    page_title="Ice Cream Revenue",
+    page_icon="🍦",
+    layout="wide"
+)
+
+MODELS = {1: "Linear", 2: "Quadratic", 3: "Cubic"}
+
+# --- Load data ---
+df = load_data(read_data, DATA_FILE.name)
+
+# --- Dashboard components ---
+st.title("Ice Cream Revenue")
+st.markdown("### Revenue vs temperature, for daily stock planning")
+st.markdown("---")
+
+degree = st.radio(
+    "Model", options=list(MODELS), format_func=MODELS.get, horizontal=True
+)
+
+# Fitted once per data version and model, later reruns only read the cache
+with st.spinner(f"Fitting model and {BOOTSTRAP_SAMPLES:,} bootstrap resamples..."):
+    model = get_model(degree)
+
+cols = st.columns(4)
+with cols[0]:
+    st.metric(label="Readings", value=f"{len(df):,}")
+with cols[1]:
+    st.metric(label="Average Revenue", value=f"{df['Revenue'].mean():,.0f}")
+with cols[2]:
+    st.metric(label="R²", value=f"{model.r2:.3f}")
+with cols[3]:
+    st.metric(label="RMSE", value=f"{model.rmse:,.1f}")
+
+revenue_model_chart(df, model)
+
+# What-if: evaluating the stored model is just a polynomial and a lookup
+@st.fragment
+def what_if_forecast(model, default_temperature):
+    """Forecast slider, rerun on its own so moving it never redraws the chart"""
+    st.markdown("## What-if forecast")
+    temperature = st.slider(
+        "Forecast temperature (°C)",
+        min_value=float(model.grid[0]),
+        max_value=float(model.grid[-1]),
+        value=default_temperature,
+        step=0.5
+    )
+    lower, upper = model.interval(temperature)
+    st.metric(
+        label=f"Expected revenue at {temperature:.1f} °C",
+        value=f"{float(model.predict(temperature)):,.0f}"
+    )
+    st.caption(f"95% bootstrap interval for the expected revenue: {float(lower):,.0f} to {float(upper):,.0f}")
+
+what_if_forecast(model, float(df['Temperature'].median()))
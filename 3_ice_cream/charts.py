@@ -0,0 +1,44 @@
+import streamlit as st
+import numpy as np
+import plotly.graph_objects as go
+from common.downsample import scatter_trace, annotate_reduction
+from common.figure_payload import compact_figure
+
+def revenue_model_figure(df, model):
+    # Band first so the points and the fitted line are drawn on top of it
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=np.concatenate((model.grid, model.grid[::-1])),
+        y=np.concatenate((model.upper, model.lower[::-1])),
+        fill='toself',
+        fillcolor='rgba(74, 118, 168, 0.3)',
+        line={'width': 0},
+        hoverinfo='skip',
+        name="95% bootstrap band"
+    ))
+    # Large reading sets are sampled (keeping the extremes) and drawn with WebGL
+    readings, shown, total = scatter_trace(
+        df['Temperature'], df['Revenue'],
+        mode='markers',
+        marker={'color': '#1E3A8A', 'size': 5, 'opacity': 0.6},
+        name="Daily readings"
+    )
+    fig.add_trace(readings)
+    fig.add_trace(go.Scatter(
+        x=model.grid, y=model.predict(model.grid),
+        mode='lines',
+        line={'color': '#F59E0B', 'width': 3},
+        name="Fitted model"
+    ))
+    fig.update_layout(
+        title="Revenue vs temperature",
+        xaxis_title="Temperature (°C)",
+        yaxis_title="Revenue",
+        height=500
+    )
+    return compact_figure(annotate_reduction(fig, shown, total))
+
+def revenue_model_chart(df, model):
+
+    fig = revenue_model_figure(df, model)
+    st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,122 @@
+import os
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import Future, ProcessPoolExecutor
+from read_data import read_data_versioned
+from resampling import design_matrix, bootstrap_predictions
+
+# Number of bootstrap resamples behind the confidence band
+BOOTSTRAP_SAMPLES = 1000
+# Points on the temperature grid where the band is evaluated
+GRID_POINTS = 200
+# Resampled rows per batch (resamples x rows), bounds worker memory
+BATCH_CELLS = 5_000_000
+# Below this many resampled rows in total a process pool costs more than it saves
+PARALLEL_MIN_CELLS = 2_000_000
+
+# Fitted models shared by every session: {(version, degree, samples): Future of a FittedModel}
+_cache = {}
+_lock = threading.Lock()
+
+def least_squares(x, y, degree):
+    """Coefficients (lowest power first) of the least-squares polynomial"""
+    coef, *_ = np.linalg.lstsq(design_matrix(x, degree), y, rcond=None)
+    return coef
+
+def _batch_sizes(total, rows):
+    per_batch = max(BATCH_CELLS // max(rows, 1), 1)
+    return [min(per_batch, total - start) for start in range(0, total, per_batch)]
+
+def bootstrap_band(x, y, degree, grid, samples=BOOTSTRAP_SAMPLES, level=0.95, seed=0, workers=None):
+    """
+    Percentile bootstrap band for the fitted mean on grid: (lower, upper).
+
+    Resamples are split into batches that run on a process pool when the
+    data is large enough to make that worthwhile.
+    """
+    batches = _batch_sizes(samples, len(x))
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    args = [(x, y, degree, grid, n, s) for n, s in zip(batches, seeds)]
+
+    if samples * len(x) >= PARALLEL_MIN_CELLS and len(batches) > 1:
+        # Spawned: forking the multi-threaded server process is unsafe
+        spawn = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=spawn) as pool:
+            parts = list(pool.map(bootstrap_predictions, *zip(*args)))
+    else:
+        parts = [bootstrap_predictions(*a) for a in args]
+
+    predictions = np.concatenate(parts)
+    alpha = (1 - level) / 2
+    lower, upper = np.quantile(predictions, [alpha, 1 - alpha], axis=0)
+    return lower, upper
+
+class FittedModel:
+    """
+    Revenue-vs-temperature polynomial with its bootstrap band.
+
+    Temperatures are standardised before fitting to keep the polynomial
+    well conditioned. Evaluating the model is only arithmetic on the stored
+    coefficients and band.
+    """
+
+    def __init__(self, temperature, revenue, degree, samples=BOOTSTRAP_SAMPLES):
+        self.degree = degree
+        self.samples = samples
+        self.center = temperature.mean()
+        self.scale = temperature.std() or 1.0
+        x = (temperature - self.center) / self.scale
+
+        self.coef = least_squares(x, revenue, degree)
+        residuals = revenue - design_matrix(x, degree) @ self.coef
+        self.rmse = float(np.sqrt(np.mean(residuals ** 2)))
+        total = np.sum((revenue - revenue.mean()) ** 2)
+        self.r2 = float(1 - np.sum(residuals ** 2) / total) if total else float('nan')
+
+        self.grid = np.linspace(temperature.min(), temperature.max(), GRID_POINTS)
+        self.lower, self.upper = bootstrap_band(
+            x, revenue, degree, (self.grid - self.center) / self.scale, samples
+        )
+
+    def predict(self, temperature):
+        x = (np.asarray(temperature, dtype='float64') - self.center) / self.scale
+        return design_matrix(x, self.degree) @ self.coef
+
+    def interval(self, temperature):
+        """Band at the given temperatures (clamped to the observed range)"""
+        return (np.interp(temperature, self.grid, self.lower),
+                np.interp(temperature, self.grid, self.upper))
+
+def get_model(degree=1, samples=BOOTSTRAP_SAMPLES):
+    """Fitted model for the current data, refitted only when the CSV changes"""
+    df, version = read_data_versioned()
+    key = (version, degree, samples)
+    future = _cache.get(key)
+    if future is None:
+        with _lock:
+            future = _cache.get(key)
+            fit = future is None
+            if fit:
+                # Drop models fitted on older versions of the data
+                for old in [k for k in _cache if k[0] != version]:
+                    del _cache[old]
+                future = _cache[key] = Future()
+        if fit:
+            # Fitted outside the lock: only sessions asking for this model wait
+            try:
+                future.set_result(FittedModel(
+                    df['Temperature'].to_numpy(), df['Revenue'].to_numpy(), degree, samples
+                ))
+            except BaseException as e:
+                with _lock:
+                    _cache.pop(key, None)
+                future.set_exception(e)
+                raise
+    return future.result()
+
+if __name__ == '__main__':
+    for degree in (1, 2, 3):
+        model = get_model(degree)
+        print(f"degree {degree}: R2={model.r2:.4f} RMSE={model.rmse:.2f} "
+              f"revenue at 25C={model.predict(25.0):.1f} band={model.interval(25.0)}")
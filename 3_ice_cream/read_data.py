@@ -0,0 +1,50 @@
+import pandas as pd
+from pathlib import Path
+from common.refresher import data_source
+
+DATA_FILE = Path(__file__).parent / "data" / "IceCreamData.csv"
+
+def file_version(path=DATA_FILE):
+    """Return (mtime_ns, size) of the data file, used to detect changes"""
+    stat = Path(path).stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+def prepare(df):
+    # Both columns are measurements, rows missing either one are unusable
+    for col in ['Temperature', 'Revenue']:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    return df.dropna(subset=['Temperature', 'Revenue']).reset_index(drop=True)
+
+def load_frame():
+    return prepare(pd.read_csv(DATA_FILE))
+
+# Process-wide data shared by every Streamlit session, refreshed in the background
+source = data_source(DATA_FILE, load_frame, file_version)
+
+def read_data_versioned():
+    """Return (frame, version) of the served data, loading it on first use"""
+    DATA_FILE.parent.mkdir(exist_ok=True, parents=True)
+    snapshot = source.current()
+    return snapshot.frame, snapshot.version
+
+def read_data():
+    """
+    Return the temperature/revenue readings as one shared, read-only DataFrame.
+
+    The CSV is parsed once per process. When the file's mtime or size
+    changes it is re-parsed on a background thread and swapped in, the
+    previous frame is served until then. Callers must not modify the
+    returned frame.
+    """
+    return read_data_versioned()[0]
+
+if __name__ == '__main__':
+    df = read_data()
+
+    print(df.columns)
+
+    print("\nFirst 5 rows")
+    print(df.head())
+
+    print("\nStatistics")
+    print(df.describe())
@@ -0,0 +1,38 @@
+"""
+Bootstrap resampling for the revenue models, run in worker processes.
+
+Workers are spawned, not forked from the threaded Streamlit server, so
+they import this module afresh: it depends on numpy only and not on the
+project's other modules.
+"""
+import numpy as np
+
+def design_matrix(x, degree):
+    """Polynomial features [1, x, x^2, ...] along the last axis"""
+    return np.power(x[..., None], np.arange(degree + 1))
+
+def bootstrap_predictions(x, y, degree, grid, samples, seed):
+    """
+    Fit `samples` resampled datasets at once and predict on grid.
+
+    A resample is represented by how often it draws each row, so the normal
+    equations of every resample come out of two matrix products against
+    the power sums of x, with no Python loop per resample.
+    Returns a (samples, len(grid)) array.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(x)
+    rows = rng.integers(0, n, size=(samples, n))
+    offsets = np.arange(samples)[:, None] * n
+    weights = np.bincount((rows + offsets).ravel(), minlength=samples * n).reshape(samples, n)
+    weights = weights.astype('float64')
+
+    # x^k for k = 0..2*degree gives every entry of X'X, x^k * y gives X'y
+    powers = design_matrix(x, 2 * degree)
+    sums = weights @ powers
+    moments = weights @ (powers[:, :degree + 1] * y[:, None])
+
+    exponents = np.add.outer(np.arange(degree + 1), np.arange(degree + 1))
+    XtX = sums[:, exponents]
+    coef = np.linalg.solve(XtX, moments[..., None])[..., 0]
+    return coef @ design_matrix(grid, degree).T
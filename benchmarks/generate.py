@@ -0,0 +1,129 @@
+"""
+Deterministic synthetic data shaped like the bundled CSVs.
+
+Use: python benchmarks/generate.py employees 1m out.csv
+     python benchmarks/generate.py pisa 10k out.csv
+"""
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Rows are written in chunks so 10M-row files never sit in memory at once
+CHUNK_ROWS = 1_000_000
+
+FIRST_NAMES = [
+    'Ann', 'Emma', 'Barbro', 'Magnus', 'Anna', 'Anders', 'Ove', 'Jane', 'Ahmed',
+    'Christina', 'Gunnel', 'Noah', 'Erik', 'Lars', 'Karin', 'Sofia', 'Johan',
+    'Maria', 'Per', 'Eva', 'Nils', 'Ida', 'Oskar', 'Maja', 'Ali', 'Li'
+]
+LAST_NAMES = [
+    'Larsson', 'Kim', 'Andersson', 'Söderström', 'Johansson', 'Karlsson',
+    'Nilsson', 'Eriksson', 'Svensson', 'Gustafsson', 'Pettersson', 'Jonsson',
+    'Lindberg', 'Berg', 'Holm', 'Nguyen', 'Ali', 'Hassan', 'Smith', 'Chen'
+]
+DEPARTMENTS = ['Product Management', 'DevOps', 'Engineering', 'Data Science', 'IT']
+POSITIONS = [
+    'AI Specialist', 'Database Administrator', 'Data Scientist',
+    'Junior Data Scientist', 'Senior Data Analyst', 'Data Architect',
+    'Junior Data Engineer', 'Senior Data Engineer', 'Senior Data Scientist',
+    'Data Engineer', 'Data Analyst'
+]
+
+COUNTRIES = [
+    'AUS', 'AUT', 'BEL', 'CAN', 'CHL', 'COL', 'CZE', 'DNK', 'EST', 'FIN', 'FRA',
+    'DEU', 'GRC', 'HUN', 'ISL', 'IRL', 'ISR', 'ITA', 'JPN', 'KOR', 'LVA', 'LTU',
+    'LUX', 'MEX', 'NLD', 'NZL', 'NOR', 'POL', 'PRT', 'SVK', 'SVN', 'ESP', 'SWE',
+    'CHE', 'TUR', 'GBR', 'USA', 'BRA', 'RUS', 'SGP', 'CHN', 'HKG', 'MAC', 'QAT',
+    'ARE', 'CRI', 'BGR'
+]
+INDICATORS = ['PISAMATH', 'PISAREAD', 'PISASCIENCE']
+SUBJECTS = ['BOY', 'GIRL', 'TOT']
+# Yearly waves, as in the extended dataset
+YEARS = np.arange(2000, 2023)
+
+def parse_size(text):
+    """'10k' -> 10_000, '1m' -> 1_000_000, plain integers pass through"""
+    text = str(text).strip().lower()
+    multipliers = {'k': 1_000, 'm': 1_000_000}
+    if text[-1] in multipliers:
+        return int(float(text[:-1]) * multipliers[text[-1]])
+    return int(text)
+
+def employee_chunk(start, stop, rng):
+    n = stop - start
+    ids = np.arange(start + 1, stop + 1)
+    first = np.array(FIRST_NAMES, dtype=object)[rng.integers(len(FIRST_NAMES), size=n)]
+    last = np.array(LAST_NAMES, dtype=object)[rng.integers(len(LAST_NAMES), size=n)]
+    department = np.array(DEPARTMENTS, dtype=object)[rng.integers(len(DEPARTMENTS), size=n)]
+    age = rng.integers(22, 66, size=n).astype('float64')
+    salary = np.round(rng.normal(52000, 9000, size=n)).clip(25000, 120000)
+
+    # A few missing values, like the real export
+    department[rng.random(n) < 0.02] = None
+    salary[rng.random(n) < 0.01] = np.nan
+
+    df = pd.DataFrame({
+        'EmployeeID': [f"E{i:07d}" for i in ids],
+        'FirstName': first,
+        'LastName': last,
+        'Age': pd.array(age, dtype='Int64'),
+        'Department': department,
+        'Position': np.array(POSITIONS, dtype=object)[rng.integers(len(POSITIONS), size=n)],
+        'Salary_SEK': pd.array(salary, dtype='Int64'),
+    })
+    df['Email'] = (df['FirstName'] + '.' + df['LastName']).str.lower() + ids.astype(str) + '@supacoolsoft.se'
+    df['PhoneNumber'] = [f"+46 (0){p // 10000000:02d} {p % 10000000:07d}" for p in rng.integers(10**8, 10**9, size=n)]
+    return df
+
+def pisa_chunk(start, stop, rng):
+    # Rows enumerate location x indicator x subject x year in the CSV's order
+    row = np.arange(start, stop)
+    per_location = len(INDICATORS) * len(SUBJECTS) * len(YEARS)
+    location = row // per_location
+    indicator = row // (len(SUBJECTS) * len(YEARS)) % len(INDICATORS)
+    subject = row // len(YEARS) % len(SUBJECTS)
+    year = row % len(YEARS)
+
+    # Sub-national regions: country code plus region number
+    country = np.array(COUNTRIES, dtype=object)[location % len(COUNTRIES)]
+    region = location // len(COUNTRIES)
+    codes = np.where(region == 0, country, country + np.char.zfill(region.astype(str), 3).astype(object))
+
+    # Smooth per-series trend plus noise, kept deterministic per row block
+    base = 480 + (location * 7919 % 60) + indicator * 5 + np.where(subject == 0, 4, np.where(subject == 1, -4, 0))
+    slope = ((location * 104729 % 21) - 10) / 10
+    value = base + slope * (YEARS[year] - YEARS[0]) + rng.normal(0, 3, size=len(row))
+
+    return pd.DataFrame({
+        'index': row,
+        'LOCATION': codes,
+        'INDICATOR': np.array(INDICATORS, dtype=object)[indicator],
+        'SUBJECT': np.array(SUBJECTS, dtype=object)[subject],
+        'TIME': YEARS[year],
+        'Value': np.round(value, 3),
+    })
+
+GENERATORS = {
+    'employees': employee_chunk,
+    'pisa': pisa_chunk,
+}
+
+def generate(kind, rows, path, seed=0):
+    """Write `rows` rows of synthetic `kind` data to path (deterministic for a seed)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    make_chunk = GENERATORS[kind]
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for chunk_index, start in enumerate(range(0, rows, CHUNK_ROWS)):
+            rng = np.random.default_rng([seed, chunk_index])
+            chunk = make_chunk(start, min(start + CHUNK_ROWS, rows), rng)
+            chunk.to_csv(f, index=False, header=(start == 0))
+    return path
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4 or sys.argv[1] not in GENERATORS:
+        print(__doc__)
+        sys.exit(1)
+    kind, size, out = sys.argv[1:]
+    print(generate(kind, parse_size(size), out))
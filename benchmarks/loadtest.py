@@ -0,0 +1,293 @@
+"""
+Concurrent-session load test for the dashboards.
+
+Use: python benchmarks/loadtest.py --sessions 1 2 4 8 --reruns 20
+     python benchmarks/loadtest.py --projects 1_pisa_scores --rows 1m --output load.json
+
+Every project runs in its own Python process, like one Streamlit server.
+Each simulated session is a Streamlit AppTest on its own thread that loads
+the page and then makes --reruns random widget interactions (sidebar
+multiselects, the distribution selectbox, the employee table search, sort
+and paging, the salary lookup, the trend ranking, the model radio and the
+forecast slider), timing every rerun.
+Expanders open in the browser without a rerun, so the widgets inside them
+stand in for them. AppTest always reruns the whole script, including
+fragments.
+
+For every concurrency level the report shows throughput, p50/p95/p99 rerun
+latency, process CPU time over wall time (stuck near 1.0 with many
+sessions means the reruns are GIL-bound) and the process' resident set
+size after the level and at its peak. Data loads, model fits and other
+first-use work run once before the first level and are not measured.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from run import ROOT, PROJECTS, prepare_workspace, git_commit
+from generate import parse_size
+
+# Entry script of every project
+APPS = {
+    '0_supahcoolsoft': 'dashboard.py',
+    '1_pisa_scores': 'dashboard.py',
+    '3_ice_cream': 'app.py',
+}
+# Seconds a single rerun may take before AppTest gives up
+RERUN_TIMEOUT = 600
+
+SEARCH_TERMS = ['', 'an', 'son', 'Data', 'Eng', 'Senior', '1']
+EMPLOYEE_IDS = ['E001', 'E042', 'E077', 'E100', 'E999']
+# Keys of MODELS in 3_ice_cream/app.py
+ICE_CREAM_DEGREES = [1, 2, 3]
+
+def find(elements, label):
+    """The widget with this label, or None if the script did not draw it"""
+    return next((widget for widget in elements if widget.label == label), None)
+
+def random_subset(rng, options, most):
+    count = int(rng.integers(1, min(most, len(options)) + 1))
+    return [options[i] for i in sorted(rng.choice(len(options), size=count, replace=False))]
+
+def supahcoolsoft_actions():
+    """Interactions with the employee details table and the salary lookup"""
+    def text(label, values):
+        def enter(at, rng):
+            find(at.text_input, label).input(str(rng.choice(values)))
+        return enter
+
+    def selectbox(label):
+        def choose(at, rng):
+            widget = find(at.selectbox, label)
+            widget.select_index(int(rng.integers(len(widget.options))))
+        return choose
+
+    def descending(at, rng):
+        widget = at.toggle[0]
+        widget.set_value(not widget.value)
+
+    def page(at, rng):
+        widget = at.number_input[0]
+        pages = int(widget.max) if widget.max is not None else 1
+        widget.set_value(int(rng.integers(1, pages + 1)))
+
+    return [
+        text("Search", SEARCH_TERMS), selectbox("Search in"), selectbox("Match"), selectbox("Sort by"),
+        descending, page, text("Employee ID", EMPLOYEE_IDS), selectbox("Compare within"),
+    ]
+
+def pisa_actions():
+    """Sidebar filters, the distribution subject and the trend ranking"""
+    # Same options as the sidebar, read from the index the dashboard already built
+    from filter_index import get_filter_index
+    index = get_filter_index()
+
+    def multiselect(label, dim, most):
+        options = index.options(dim)
+        def choose(at, rng):
+            find(at.sidebar.multiselect, label).set_value(random_subset(rng, options, most))
+        return choose
+
+    def distribution(at, rng):
+        widget = find(at.selectbox, "Select subject for score distribution:")
+        if widget is None:
+            # Only drawn with more than one subject selected
+            find(at.sidebar.multiselect, "Select Subjects").set_value(index.options('indicator'))
+        else:
+            widget.select_index(int(rng.integers(len(widget.options))))
+
+    def trend_subject(at, rng):
+        widget = find(at.selectbox, "Subject area")
+        widget.select_index(int(rng.integers(len(widget.options))))
+
+    def significant_only(at, rng):
+        widget = find(at.toggle, "Significant trends only")
+        widget.set_value(not widget.value)
+
+    return [
+        multiselect("Select Countries", 'location', 8),
+        multiselect("Select Subjects", 'indicator', 3),
+        multiselect("Select Gender", 'subject', 3),
+        multiselect("Select Years", 'time_period', len(index.options('time_period'))),
+        distribution,
+        trend_subject,
+        significant_only,
+    ]
+
+def ice_cream_actions():
+    """Model choice and the what-if slider"""
+    def model(at, rng):
+        at.radio[0].set_value(int(rng.choice(ICE_CREAM_DEGREES)))
+
+    def temperature(at, rng):
+        widget = at.slider[0]
+        steps = int(round((widget.max - widget.min) / widget.step))
+        widget.set_value(widget.min + widget.step * int(rng.integers(steps + 1)))
+
+    return [model, temperature]
+
+ACTIONS = {
+    '0_supahcoolsoft': supahcoolsoft_actions,
+    '1_pisa_scores': pisa_actions,
+    '3_ice_cream': ice_cream_actions,
+}
+
+def memory_mb():
+    """(current, peak) resident set size of this process in MB"""
+    try:
+        status = Path('/proc/self/status').read_text()
+    except OSError:
+        # No procfs (macOS): only the peak is known, in bytes there
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 ** 2
+        return float('nan'), peak
+    fields = dict(line.split(':', 1) for line in status.splitlines() if ':' in line)
+    return int(fields['VmRSS'].split()[0]) / 1024, int(fields['VmHWM'].split()[0]) / 1024
+
+def run_level(script, actions, sessions, reruns, seed):
+    """Run the sessions at once, return the level summary"""
+    from streamlit.testing.v1 import AppTest
+    latencies, errors = [], []
+    lock = threading.Lock()
+    start_line = threading.Barrier(sessions)
+
+    def session(number):
+        rng = np.random.default_rng([seed, sessions, number])
+        at = AppTest.from_file(str(script), default_timeout=RERUN_TIMEOUT)
+        start_line.wait()
+        for step in range(reruns + 1):
+            if step:
+                actions[int(rng.integers(len(actions)))](at, rng)
+            begin = time.perf_counter()
+            at.run()
+            elapsed = time.perf_counter() - begin
+            with lock:
+                latencies.append(elapsed)
+                errors.extend(exception.message for exception in at.exception)
+
+    threads = [threading.Thread(target=session, args=(number,)) for number in range(sessions)]
+    wall, cpu = time.perf_counter(), time.process_time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    rss, peak = memory_mb()
+    return {
+        'sessions': sessions,
+        'reruns': len(latencies),
+        'wall_s': wall,
+        'throughput': len(latencies) / wall,
+        'p50_ms': p50 * 1000,
+        'p95_ms': p95 * 1000,
+        'p99_ms': p99 * 1000,
+        'max_ms': max(latencies) * 1000,
+        'cpu_per_wall': cpu / wall,
+        'rss_mb': rss,
+        'peak_rss_mb': peak,
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+    }
+
+def run_worker(project, project_dir, levels, reruns, seed):
+    """Runs inside the child process: every level in turn, JSON on stdout"""
+    from streamlit.logger import get_logger
+    from streamlit.testing.v1 import AppTest
+    # Streamlit logs a line per deprecated argument on every rerun, and
+    # AppTest resets the log level on every run
+    get_logger('streamlit.deprecation_util').disabled = True
+    project_dir = Path(project_dir)
+    # The project's modules, and the shared helpers next to it
+    sys.path[:0] = [str(project_dir), str(project_dir.parent)]
+    script = project_dir / APPS[project]
+
+    # First-use work (parsing, indexes, model fits) is not what is measured
+    warmup = AppTest.from_file(str(script), default_timeout=RERUN_TIMEOUT).run()
+    if warmup.exception:
+        raise RuntimeError(warmup.exception[0].message)
+    actions = ACTIONS[project]()
+
+    results = []
+    for sessions in levels:
+        results.append(run_level(script, actions, sessions, reruns, seed))
+        result = results[-1]
+        print(f"  {sessions} sessions: p95 {result['p95_ms']:.0f} ms, "
+              f"{result['throughput']:.1f} reruns/s, RSS {result['rss_mb']:.0f} MB", file=sys.stderr)
+    print(json.dumps(results))
+
+def run(projects, levels, reruns, rows, seed):
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'reruns_per_session': reruns,
+        'results': [],
+    }
+    for project in projects:
+        print(project, file=sys.stderr)
+        with tempfile.TemporaryDirectory() as workspace:
+            # Generated data where the benchmarks have a generator, the bundled CSV otherwise
+            if rows and project in PROJECTS:
+                prepare_workspace(project, rows, workspace)
+                project_dir = Path(workspace) / project
+            else:
+                project_dir = ROOT / project
+            proc = subprocess.run(
+                [sys.executable, __file__, '--worker', project, str(project_dir),
+                 '--sessions', *map(str, levels), '--reruns', str(reruns), '--seed', str(seed)],
+                capture_output=True, text=True
+            )
+        sys.stderr.write(proc.stderr)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Load test worker failed for {project}")
+        data_rows = rows if rows and project in PROJECTS else None
+        for result in json.loads(proc.stdout.strip().splitlines()[-1]):
+            report['results'].append({'project': project, 'rows': data_rows, **result})
+    return report
+
+def print_report(report):
+    print(f"{'project':16} {'sessions':>8} {'reruns':>6} {'reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'cpu/wall':>8} {'RSS MB':>7} {'peak MB':>7} {'errors':>6}")
+    for r in report['results']:
+        print(f"{r['project']:16} {r['sessions']:8} {r['reruns']:6} {r['throughput']:9.2f} {r['p50_ms']:8.0f} "
+              f"{r['p95_ms']:8.0f} {r['p99_ms']:8.0f} {r['cpu_per_wall']:8.2f} {r['rss_mb']:7.0f} "
+              f"{r['peak_rss_mb']:7.0f} {r['errors']:6}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--projects', nargs='+', default=list(APPS), choices=list(APPS))
+    parser.add_argument('--sessions', nargs='+', type=int, default=[1, 2, 4, 8],
+                        help="concurrency levels, run in this order in one process")
+    parser.add_argument('--reruns', type=int, default=20, help="widget interactions per session")
+    parser.add_argument('--rows', help="generated data size, e.g. 1m (bundled data if omitted)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="also write the report as JSON")
+    parser.add_argument('--worker', nargs=2, metavar=('PROJECT', 'PROJECT_DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker, args.sessions, args.reruns, args.seed)
+        return
+    report = run(args.projects, args.sessions, args.reruns, args.rows and parse_size(args.rows), args.seed)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {len(report['results'])} results to {args.output}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
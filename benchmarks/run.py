@@ -0,0 +1,230 @@
+"""
+Benchmark suite for both dashboards on synthetic data.
+
+Use: python benchmarks/run.py --sizes 10k 1m --output results.json
+     python benchmarks/run.py --compare before.json after.json
+
+Every (project, size) pair runs in its own Python process against a copy of
+the project whose data folder holds generated CSVs, so module caches and
+memory from one run never leak into the next.
+"""
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from generate import generate, parse_size
+
+ROOT = Path(__file__).resolve().parent.parent
+# Generated CSVs are reused between runs, they are deterministic per size
+DATA_CACHE = Path(__file__).resolve().parent / ".data"
+
+PROJECTS = {
+    '0_supahcoolsoft': ('employees', 'supahcoolsoft.csv'),
+    '1_pisa_scores': ('pisa', 'OECD PISA data.csv'),
+}
+# Shared code copied next to the project, if the tree has any
+SHARED_DIRS = ['common']
+
+def timed(fn, repeat=3):
+    """Run fn repeat times, return timing summary in seconds"""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return {'min': min(runs), 'median': statistics.median(runs), 'runs': runs}
+
+def supahcoolsoft_cases():
+    import read_data
+    import aggregates
+    import kpis
+    import charts
+    import employee_table
+    import salary_index
+
+    yield 'read_data (cold)', lambda: read_data.read_data(), 1
+    yield 'read_data (cached)', lambda: read_data.read_data(), 5
+
+    df = read_data.read_data()
+    yield 'compute_aggregates', lambda: aggregates.compute_aggregates(df), 3
+    yield 'KpiEngine full recompute', lambda: kpis.KpiEngine().company_kpis(), 1
+    yield 'company_kpis (cached)', lambda: kpis.company_kpis(), 5
+    yield 'EmployeeIndex build', lambda: employee_table.EmployeeIndex(df), 1
+
+    index = employee_table.get_employee_index()
+    yield 'employee search + page', lambda: index.page(index.rows('an', mode='substring', sort_by='Salary_SEK')), 5
+
+    yield 'SalaryIndex build', lambda: salary_index.SalaryIndex(index), 1
+    salaries = salary_index.get_salary_index()
+    employee_id = df['EmployeeID'].iloc[len(df) // 2]
+    yield 'salary lookup + peer band', lambda: salary_index.peer_band(salaries, employee_id, by='Position', limit=50), 5
+
+    agg = aggregates.get_aggregates()
+    yield 'chart: employees_by_department', lambda: charts.employees_by_department_figure(agg), 3
+    yield 'chart: salary_histogram', lambda: charts.histogram_figure(*agg['salary_hist'], "Salary distribution", "Salary (SEK)"), 3
+    yield 'chart: salary_boxplot', lambda: charts.boxplot_figure(agg['salary_box'], agg['departments'], "Salaries per department", "Salary (SEK)"), 3
+    yield 'chart: age_histogram', lambda: charts.histogram_figure(*agg['age_hist'], "Age distribution", "Age"), 3
+    yield 'chart: age_boxplot', lambda: charts.boxplot_figure(agg['age_box'], agg['departments'], "Age per department", "Age"), 3
+
+def pisa_cases():
+    import read_data
+    import filter_index
+    import cube
+    import trends
+    import charts
+    from labels import country_codes
+
+    yield 'read_data (cold)', lambda: read_data.read_data(), 1
+    yield 'read_data (cached)', lambda: read_data.read_data(), 5
+
+    df = read_data.read_data()
+    yield 'FilterIndex build', lambda: filter_index.FilterIndex(df), 1
+    index = filter_index.get_filter_index()
+    locations = index.options('location')[:5]
+    selection = dict(location=locations, subject=['TOT'])
+    yield 'filter selection', lambda: index.filter(**selection), 5
+
+    yield 'ScoreCube build', lambda: cube.ScoreCube(df), 1
+    # kpis reads the data at import, so import it only once the load is timed
+    import kpis
+    kpis.get_top_countries()
+    yield 'kpi: get_top_countries', lambda: kpis.get_top_countries(), 5
+    yield 'kpi: get_most_improved', lambda: kpis.get_most_improved(), 5
+    yield 'kpi: get_gender_gap', lambda: kpis.get_gender_gap(), 5
+    yield 'kpi: get_all_improvements', lambda: kpis.get_all_improvements(), 3
+    yield 'kpi: get_rankings', lambda: kpis.get_rankings(), 3
+
+    score_cube = cube.get_cube()
+    yield 'TrendFits fit (all series)', lambda: trends.TrendFits(score_cube), 3
+    fits = trends.get_trends()
+    yield 'trend: fastest_changes', lambda: fits.fastest_changes('PISAMATH', 'TOT'), 5
+
+    filtered = index.filter(**selection)
+    yield 'chart: scores_by_location', lambda: charts.scores_by_location_figure(filtered, country_codes), 3
+    yield 'chart: score_trends', lambda: charts.score_trends_figures(filtered, country_codes), 3
+    projections = fits.projection_lines(locations, index.options('indicator'), 'TOT')
+    yield 'chart: score_trends + projections', lambda: charts.score_trends_figures(filtered, country_codes, projections), 3
+    yield 'chart: score_distribution', lambda: charts.score_distribution_figure(filtered), 3
+
+CASES = {
+    '0_supahcoolsoft': supahcoolsoft_cases,
+    '1_pisa_scores': pisa_cases,
+}
+
+def apptest_cases(script):
+    """Full-script runs through Streamlit's in-process test harness"""
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return
+    app = AppTest.from_file(str(script), default_timeout=600)
+    yield 'AppTest first run', lambda: app.run(), 1
+    yield 'AppTest rerun', lambda: app.run(), 3
+
+def run_worker(project, workspace):
+    """Runs inside the child process: time every case and print JSON"""
+    project_dir = Path(workspace) / project
+    # The project's modules, and the shared helpers next to it
+    sys.path[:0] = [str(project_dir), str(project_dir.parent)]
+    results = []
+    for cases in (CASES[project](), apptest_cases(project_dir / 'dashboard.py')):
+        for name, fn, repeat in cases:
+            results.append({'name': name, 'seconds': timed(fn, repeat)})
+            print(f"  {name}: {results[-1]['seconds']['min']:.4f}s", file=sys.stderr)
+    print(json.dumps(results))
+
+def prepare_workspace(project, rows, workspace):
+    """Copy the project (without its data) and link in a generated CSV"""
+    kind, filename = PROJECTS[project]
+    csv = DATA_CACHE / f"{kind}-{rows}.csv"
+    if not csv.exists():
+        print(f"Generating {csv.name}", file=sys.stderr)
+        generate(kind, rows, csv)
+
+    target = Path(workspace) / project
+    shutil.copytree(ROOT / project, target, ignore=shutil.ignore_patterns('data', '__pycache__'))
+    (target / 'data').mkdir()
+    (target / 'data' / filename).symlink_to(csv)
+    for shared in SHARED_DIRS:
+        if (ROOT / shared).is_dir():
+            shutil.copytree(ROOT / shared, Path(workspace) / shared,
+                            ignore=shutil.ignore_patterns('__pycache__'), dirs_exist_ok=True)
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(sizes, projects):
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': [],
+    }
+    for size in sizes:
+        rows = parse_size(size)
+        for project in projects:
+            print(f"{project} @ {rows:,} rows", file=sys.stderr)
+            with tempfile.TemporaryDirectory() as workspace:
+                prepare_workspace(project, rows, workspace)
+                proc = subprocess.run(
+                    [sys.executable, __file__, '--worker', project, workspace],
+                    capture_output=True, text=True
+                )
+                sys.stderr.write(proc.stderr)
+                if proc.returncode != 0:
+                    raise RuntimeError(f"Benchmark worker failed for {project} @ {rows}")
+                for result in json.loads(proc.stdout.strip().splitlines()[-1]):
+                    report['results'].append({'project': project, 'rows': rows, **result})
+    return report
+
+def compare(before_path, after_path):
+    """Print the median-time ratio of every case present in both reports"""
+    def load(path):
+        with open(path) as f:
+            report = json.load(f)
+        return report, {(r['project'], r['rows'], r['name']): r['seconds']['median'] for r in report['results']}
+
+    before, old = load(before_path)
+    after, new = load(after_path)
+    print(f"{'case':60} {before['commit'] or 'before':>12} {after['commit'] or 'after':>12} {'ratio':>7}")
+    for key in sorted(old.keys() & new.keys()):
+        project, rows, name = key
+        label = f"{project} {rows:,} {name}"
+        print(f"{label:60} {old[key]:12.4f} {new[key]:12.4f} {new[key] / old[key] if old[key] else float('nan'):7.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=['10k'], help="row counts, e.g. 10k 1m 10m")
+    parser.add_argument('--projects', nargs='+', default=list(PROJECTS), choices=list(PROJECTS))
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'))
+    parser.add_argument('--worker', nargs=2, metavar=('PROJECT', 'WORKSPACE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+    elif args.compare:
+        compare(*args.compare)
+    else:
+        report = run(args.sizes, args.projects)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {len(report['results'])} results to {args.output}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""
+Memory-mapped columnar cache for parsed CSV data.
+
+The first load of a CSV writes every column of the parsed frame to a .npy
+file in `<csv>.columns/<sha256>/`. Later loads, in any process, memory-map
+those files read-only instead of parsing the CSV, so all workers share one
+page-cache copy of the numeric and categorical columns. Categorical columns
+are stored as their integer codes with the categories in a sidecar file;
+free-text columns are stored the same way but expanded back into strings
+on load, so they are held per process.
+
+`<csv>.columns/manifest.json` points at the cache for the current file.
+It is trusted while the CSV's mtime and size match; otherwise the file is
+hashed, and only parsed again when its content really changed.
+
+Set DASHBOARD_COLUMNAR_CACHE=0 to always parse the CSV.
+"""
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+ENABLED = os.environ.get('DASHBOARD_COLUMNAR_CACHE', '1') != '0'
+# Bump when the on-disk layout changes, older caches are then rebuilt
+FORMAT_VERSION = 1
+
+def cache_dir(csv_path):
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.name + '.columns')
+
+def file_hash(path):
+    """sha256 of the file contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_json(path, data):
+    # Written under a temporary name and renamed, readers never see half a file
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+def _label_list(values):
+    """Labels as JSON-safe Python values"""
+    return [value.item() if isinstance(value, np.generic) else value for value in values]
+
+def write_columns(df, directory):
+    """Write every column of df to directory and return the column manifest"""
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        entry = {'name': name, 'file': f'{i}.npy', 'dtype': str(series.dtype)}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            entry['kind'] = 'category'
+            entry['ordered'] = bool(series.cat.ordered)
+            labels = series.cat.categories
+            codes = series.cat.codes.to_numpy()
+        elif series.dtype.kind in 'biufcmM':
+            entry['kind'] = 'numeric'
+            np.save(directory / entry['file'], series.to_numpy())
+            columns.append(entry)
+            continue
+        else:
+            entry['kind'] = 'text'
+            codes, labels = pd.factorize(series)
+            # Smallest integer type that holds every code
+            codes = codes.astype(np.min_scalar_type(-len(labels) - 1))
+        entry['labels'] = f'{i}.labels.json'
+        (directory / entry['labels']).write_text(json.dumps(_label_list(labels)))
+        np.save(directory / entry['file'], codes)
+        columns.append(entry)
+    return columns
+
+def read_columns(directory, columns):
+    """Frame over the memory-mapped columns of one cache directory"""
+    data = {}
+    for entry in columns:
+        values = np.load(directory / entry['file'], mmap_mode='r')
+        if entry['kind'] == 'numeric':
+            data[entry['name']] = values
+            continue
+        labels = json.loads((directory / entry['labels']).read_text())
+        if entry['kind'] == 'category':
+            dtype = pd.CategoricalDtype(labels, ordered=entry['ordered'])
+            # The codes were written by write_columns, no need to scan them again
+            data[entry['name']] = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+        else:
+            data[entry['name']] = pd.Series(
+                pd.Categorical.from_codes(values, categories=labels), copy=False
+            ).astype(entry['dtype'])
+    return pd.DataFrame(data, copy=False)
+
+def _build(csv_path, parse, digest, schema):
+    root = cache_dir(csv_path)
+    root.mkdir(exist_ok=True)
+    tmp = root / f'{digest}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+    df = parse()
+    columns = write_columns(df, tmp)
+    _write_json(tmp / 'columns.json', {
+        'format': FORMAT_VERSION, 'schema': schema, 'rows': len(df), 'columns': columns
+    })
+    try:
+        os.rename(tmp, root / digest)
+    except OSError:
+        # Another process finished the same cache first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def _load_entry(root, digest, schema):
+    path = root / digest / 'columns.json'
+    if not path.exists():
+        return None
+    entry = json.loads(path.read_text())
+    if entry.get('format') != FORMAT_VERSION or entry.get('schema') != schema:
+        return None
+    return entry
+
+def load_columnar(csv_path, parse, schema=None):
+    """
+    Return the parsed frame for csv_path, memory-mapped from the cache.
+
+    parse() is only called to (re)build the cache when the CSV content has
+    no cache yet. schema is any JSON-able description of how parse() reads
+    the file (columns, dtypes); a cache written with another schema is
+    rebuilt. The returned frame is read-only.
+    """
+    schema = json.loads(json.dumps(schema))
+    if not ENABLED:
+        return parse()
+
+    csv_path = Path(csv_path)
+    root = cache_dir(csv_path)
+    stat = csv_path.stat()
+    source = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    manifest_path = root / 'manifest.json'
+
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    if manifest.get('source') == source:
+        digest = manifest['sha256']
+    else:
+        digest = file_hash(csv_path)
+
+    entry = _load_entry(root, digest, schema)
+    if entry is None:
+        shutil.rmtree(root / digest, ignore_errors=True)
+        _build(csv_path, parse, digest, schema)
+        entry = _load_entry(root, digest, schema)
+
+    if manifest.get('source') != source or manifest.get('sha256') != digest:
+        _write_json(manifest_path, {'source': source, 'sha256': digest})
+        # Caches of older file contents are no longer referenced. Processes
+        # that still map them keep their pages until they reload.
+        for old in root.iterdir():
+            if old.is_dir() and old.name != digest and not old.name.endswith('.tmp'):
+                shutil.rmtree(old, ignore_errors=True)
+
+    return read_columns(root / digest, entry['columns'])
@@ -0,0 +1,98 @@
+"""
+Server-side point reduction and WebGL switching for large Plotly charts.
+
+Above WEBGL_THRESHOLD points a chart switches to WebGL traces. Above
+MAX_POINTS the points themselves are reduced before they leave the server:
+lines with Largest-Triangle-Three-Buckets (keeps the visual shape), point
+clouds and outliers with a seeded sample that always keeps the extremes.
+Charts that were reduced get an annotation saying how many points are shown.
+
+Both limits can be set with DASHBOARD_WEBGL_THRESHOLD and
+DASHBOARD_MAX_POINTS.
+"""
+import os
+import numpy as np
+import plotly.graph_objects as go
+
+WEBGL_THRESHOLD = int(os.environ.get('DASHBOARD_WEBGL_THRESHOLD', 5_000))
+MAX_POINTS = int(os.environ.get('DASHBOARD_MAX_POINTS', 20_000))
+# Share of a sample reserved for the lowest and highest values
+EXTREME_SHARE = 0.1
+
+def use_webgl(points):
+    return points > WEBGL_THRESHOLD
+
+def lttb(x, y, n_out):
+    """
+    Indices of n_out points chosen with Largest-Triangle-Three-Buckets.
+
+    x must be sorted. The first and last points are always kept; every
+    bucket in between keeps the point forming the largest triangle with
+    the previously kept point and the average of the next bucket.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+
+    # Bucket i holds points edges[i]..edges[i + 1], the last "bucket" is point n - 1
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype('int64') + 1
+    selected = np.empty(n_out, dtype='int64')
+    selected[0], selected[-1] = 0, n - 1
+
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+        area = np.abs(
+            (x[prev] - avg_x) * (y[start:end] - y[prev])
+            - (x[prev] - x[start:end]) * (avg_y - y[prev])
+        )
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+def sample_extremes(values, n_out, seed=0):
+    """
+    Sorted indices of an n_out sample that keeps the most extreme values.
+
+    EXTREME_SHARE of the sample goes to the lowest and highest values, the
+    rest is drawn uniformly (with a fixed seed, so reruns give the same
+    points) from everything in between.
+    """
+    n = len(values)
+    if n_out >= n:
+        return np.arange(n)
+    order = np.argsort(values, kind='stable')
+    tails = int(n_out * EXTREME_SHARE / 2)
+    middle = order[tails:n - tails]
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(middle, size=n_out - 2 * tails, replace=False)
+    return np.sort(np.concatenate((order[:tails], picked, order[n - tails:])))
+
+def scatter_trace(x, y, seed=0, **kwargs):
+    """
+    Scatter (or Scattergl) trace for a point cloud, sampled down to MAX_POINTS.
+
+    Returns (trace, shown, total).
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    total = len(x)
+    keep = sample_extremes(y, MAX_POINTS, seed)
+    trace_type = go.Scattergl if use_webgl(len(keep)) else go.Scatter
+    return trace_type(x=x[keep], y=y[keep], **kwargs), len(keep), total
+
+def annotate_reduction(fig, shown, total):
+    """Add a 'showing n of m points' note to a figure whose points were reduced"""
+    if shown >= total:
+        return fig
+    fig.add_annotation(
+        text=f"Showing {shown:,} of {total:,} points",
+        xref='paper', yref='paper', x=1, y=1.06,
+        xanchor='right', yanchor='bottom',
+        showarrow=False, font={'size': 11, 'color': '#9CA3AF'}
+    )
+    return fig
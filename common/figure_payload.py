@@ -0,0 +1,108 @@
+"""
+Compact Plotly figure payloads.
+
+Streamlit sends every figure on every rerun as the output of
+plotly.io.to_json, which writes numpy arrays as base64 typed arrays in
+their own dtype. compact_figure() shrinks those arrays before they are
+sent: integral values go to the smallest of int8/int16/int32 (unsigned
+when non-negative), other floats to float32 when that keeps every value to
+FLOAT32_RTOL. customdata columns no hover or text template reads are
+dropped, the charts have no selection events that would need them.
+
+Streamlit does not resend an element whose message the browser still
+holds from the session's last run, it sends a reference to the message's
+hash instead. That only works when an unchanged figure serializes to the
+same bytes on every rerun, so the dtype chosen for an array depends on its
+values alone, and only for messages of at least
+global.minCachedMessageSize bytes (lowered in .streamlit/config.toml).
+"""
+import re
+import numpy as np
+
+# Largest relative error a float32 cast may introduce, more digits than
+# any axis or hover label shows
+FLOAT32_RTOL = 1e-6
+# Plotly.js typed array integer types, smallest first
+INT_TYPES = [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32]
+
+CUSTOMDATA_FIELD = re.compile(r'customdata(?:\[(\d+)\])?')
+
+def compact_array(values):
+    """values in the smallest typed-array dtype that holds them, or unchanged"""
+    if not isinstance(values, np.ndarray) or values.size == 0 or values.dtype.kind not in 'iuf':
+        return values
+    if values.dtype.kind == 'f':
+        if not np.isfinite(values).all() or not np.array_equal(values, np.round(values)):
+            narrowed = values.astype('float32')
+            close = np.allclose(narrowed, values, rtol=FLOAT32_RTOL, atol=0, equal_nan=True)
+            return narrowed if close and values.dtype != np.float32 else values
+    low, high = values.min(), values.max()
+    for dtype in INT_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return values
+
+def _templates(trace):
+    """Every hover and text template of the trace, as one string"""
+    parts = []
+    for name in ('hovertemplate', 'texttemplate'):
+        template = trace[name] if name in trace else None
+        if isinstance(template, str):
+            parts.append(template)
+        elif template is not None:
+            parts.extend(str(item) for item in template)
+    return '\n'.join(parts)
+
+def strip_customdata(trace):
+    """Drop the customdata columns that no template of the trace refers to"""
+    if 'customdata' not in trace or trace.customdata is None:
+        return
+    data = np.asarray(trace.customdata)
+    templates = _templates(trace)
+    fields = [match.group(1) for match in CUSTOMDATA_FIELD.finditer(templates)]
+    if not fields:
+        trace.customdata = None
+        return
+    if data.ndim != 2 or None in fields:
+        return
+    used = sorted({int(field) for field in fields})
+    if len(used) == data.shape[1]:
+        return
+    renumber = {old: new for new, old in enumerate(used)}
+    data = data[:, used]
+    if data.dtype == object:
+        # Columns mixed with text come as objects, numbers alone can be typed
+        try:
+            data = data.astype('float64')
+        except (TypeError, ValueError):
+            pass
+    trace.customdata = data
+    for name in ('hovertemplate', 'texttemplate'):
+        if isinstance(trace[name] if name in trace else None, str):
+            trace[name] = CUSTOMDATA_FIELD.sub(
+                lambda match: f'customdata[{renumber[int(match.group(1))]}]', trace[name]
+            )
+
+def _compact_props(trace, props, path=()):
+    for name, value in props.items():
+        if isinstance(value, dict):
+            _compact_props(trace, value, path + (name,))
+        elif isinstance(value, np.ndarray):
+            compacted = compact_array(value)
+            if compacted is not value:
+                # Plotly ignores a new value that compares equal to the old one
+                key = '.'.join(path + (name,))
+                trace[key] = None
+                trace[key] = compacted
+
+def compact_figure(fig):
+    """
+    Shrink the figure's trace arrays in place for sending, and return it.
+
+    Call it once where the figure is built; cached figures stay compact.
+    """
+    for trace in fig.data:
+        strip_customdata(trace)
+        _compact_props(trace, trace.to_plotly_json())
+    return fig
@@ -0,0 +1,123 @@
+"""
+Chunked, parallel CSV parsing for the dashboards' cold loads.
+
+read_csv splits the file into byte ranges on row boundaries and parses them
+on a thread pool, each range with pyarrow's CSV reader when pyarrow is
+installed (the pandas C parser otherwise). The pool is the only source of
+parallelism: pyarrow's own threads are turned off per range, a pool of
+cpu_count threads each using every core would oversubscribe them. Only the projected
+columns are converted, with the declared dtypes; categorical chunks are
+combined with union_categoricals. A progress callback gets the bytes parsed
+so far after every range.
+
+Rows must not contain quoted line breaks, ranges are cut at newlines.
+"""
+import io
+import os
+import sys
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+# Bytes per parsed range
+CHUNK_BYTES = 64 * 1024 ** 2
+# Files smaller than this load without progress output
+PROGRESS_MIN_BYTES = 256 * 1024 ** 2
+
+def engine():
+    return 'pyarrow' if pa is not None else 'c'
+
+def _arrow_type(dtype):
+    if dtype == 'category':
+        return pa.dictionary(pa.int32(), pa.string())
+    if dtype in ('str', 'string', 'object'):
+        return pa.string()
+    return pa.from_numpy_dtype(np.dtype(dtype))
+
+def split_ranges(path, start, size, chunk_bytes):
+    """(start, end) byte ranges of about chunk_bytes that end on a newline"""
+    ranges = []
+    with open(path, 'rb') as f:
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def parse_range(path, start, end, header, usecols, dtype):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    if pa is not None:
+        table = pa_csv.read_csv(
+            io.BytesIO(data),
+            read_options=pa_csv.ReadOptions(column_names=header, use_threads=False),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=usecols,
+                column_types={col: _arrow_type(t) for col, t in dtype.items()},
+                strings_can_be_null=True
+            )
+        )
+        return table.to_pandas()
+    return pd.read_csv(io.BytesIO(data), header=None, names=header, usecols=usecols, dtype=dtype)
+
+def concat_chunks(frames, columns):
+    data = {}
+    for col in columns:
+        parts = [frame[col] for frame in frames]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            # Every chunk found its own categories, merge them sorted like read_csv does
+            data[col] = pd.Series(union_categoricals(parts, sort_categories=True), name=col)
+        else:
+            data[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(data)
+
+def read_csv(path, usecols=None, dtype=None, chunk_bytes=CHUNK_BYTES, workers=None, progress=None):
+    """
+    Parse a CSV like pd.read_csv(path, usecols=usecols, dtype=dtype).
+
+    dtype maps column names to 'category', 'str' or a numpy dtype; other
+    columns are inferred. progress(done_bytes, total_bytes) is called from
+    the calling thread after every parsed range.
+    """
+    header = list(pd.read_csv(path, nrows=0).columns)
+    usecols = [col for col in header if usecols is None or col in usecols]
+    dtype = {col: t for col, t in (dtype or {}).items() if col in usecols}
+
+    with open(path, 'rb') as f:
+        f.readline()
+        body = f.tell()
+    size = os.path.getsize(path)
+    ranges = split_ranges(path, body, size, chunk_bytes)
+    if not ranges:
+        return pd.read_csv(path, usecols=usecols, dtype=dtype)
+
+    frames = []
+    done = body
+    with ThreadPoolExecutor(workers or os.cpu_count() or 1) as pool:
+        futures = [pool.submit(parse_range, path, start, end, header, usecols, dtype) for start, end in ranges]
+        for (start, end), future in zip(ranges, futures):
+            frames.append(future.result())
+            done += end - start
+            if progress:
+                progress(done, size)
+    return concat_chunks(frames, usecols)
+
+def log_progress(label, min_bytes=PROGRESS_MIN_BYTES):
+    """Progress callback writing '<label>: 42% of 3.1 GB' to stderr for large files"""
+    def report(done, total):
+        if total < min_bytes:
+            return
+        end = '\n' if done >= total else ''
+        sys.stderr.write(f"\r{label}: {done / total:4.0%} of {total / 1024 ** 3:.1f} GB{end}")
+        sys.stderr.flush()
+    return report
@@ -0,0 +1,37 @@
+"""
+Page helpers shared by the dashboards: stylesheets and the data-load guard.
+"""
+import functools
+import streamlit as st
+from pathlib import Path
+
+@functools.lru_cache(maxsize=None)
+def _read_css(path, mtime_ns):
+    return Path(path).read_text(encoding='utf-8')
+
+def load_css(path):
+    """Apply a stylesheet to the page, read once per process and again only when edited"""
+    path = Path(path)
+    try:
+        css = _read_css(path, path.stat().st_mtime_ns)
+    except OSError as e:
+        st.warning(f"Could not load {path.name} file. Error: {e}")
+        return
+    st.markdown(f'<style>{css}</style>', unsafe_allow_html=True)
+
+def load_data(load, data_file, is_empty=lambda data: len(data) == 0):
+    """
+    Return load(), or stop the page with an error if it fails or is empty.
+
+    data_file is the CSV name shown in the hint.
+    """
+    try:
+        data = load()
+    except Exception as e:
+        st.error(f"An error occurred when loading data: {e}")
+        st.info(f"Please check that the file '{data_file}' exists in the 'data' folder.")
+        st.stop()
+    if is_empty(data):
+        st.error("No data found. Please check the CSV file.")
+        st.stop()
+    return data
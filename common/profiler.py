@@ -0,0 +1,187 @@
+"""
+Per-rerun timing spans for the dashboards.
+
+Enable with the environment variable DASHBOARD_PROFILE=1, or with
+DASHBOARD_PROFILE=query for only the reruns of a dashboard opened with
+?profile=1 in the URL; visitors cannot turn it on for a server started
+without it. A profiled rerun is broken down into named spans (wall time
+and peak Python memory), shown in a sidebar panel, appended to
+profiles/reruns.jsonl and summarised in one Prometheus textfile per server
+process, profiles/dashboard_profile_<pid>.prom. DASHBOARD_PROFILE_DIR
+changes the folder. The log is moved to reruns.jsonl.1 once it grows past
+DASHBOARD_PROFILE_MAX_MB (default 50), replacing the previous one.
+
+Peak memory comes from tracemalloc, which is process-wide: with several
+sessions rerunning at once the figures include their allocations too. It
+only traces while a profiled rerun is running.
+"""
+import os
+import json
+import time
+import threading
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import streamlit as st
+
+MODE = os.environ.get('DASHBOARD_PROFILE', '').lower()
+ENABLED = MODE in ('1', 'true', 'yes')
+# ?profile=1 is honoured only when the server allows it
+QUERY_ENABLED = MODE == 'query'
+OUTPUT_DIR = Path(os.environ.get('DASHBOARD_PROFILE_DIR', Path.cwd() / 'profiles'))
+MAX_LOG_BYTES = int(float(os.environ.get('DASHBOARD_PROFILE_MAX_MB', 50)) * 1024 ** 2)
+
+# Histogram buckets (seconds) for the Prometheus textfile
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Cumulative per-(app, stage) histograms behind the textfile, shared by sessions
+_histograms = {}
+_lock = threading.Lock()
+
+# Profiled reruns in progress, tracemalloc runs while there is any
+_active = 0
+_tracing_lock = threading.Lock()
+
+def profiling_enabled():
+    if ENABLED:
+        return True
+    if not QUERY_ENABLED:
+        return False
+    try:
+        return st.query_params.get('profile') == '1'
+    except Exception:
+        return False
+
+def _start_tracing():
+    global _active
+    with _tracing_lock:
+        _active += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+def _stop_tracing():
+    global _active
+    with _tracing_lock:
+        _active -= 1
+        if _active == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+class RerunProfiler:
+    """Collects named spans for one rerun of a dashboard script"""
+
+    def __init__(self, app, enabled=None):
+        self.app = app
+        self.enabled = profiling_enabled() if enabled is None else enabled
+        self.spans = []
+        self.started = time.perf_counter()
+        if self.enabled:
+            _start_tracing()
+            # Also released when a rerun stops before finish(), once the
+            # script's globals are dropped
+            self.release = weakref.finalize(self, _stop_tracing)
+
+    @contextmanager
+    def span(self, name):
+        """Time the block and record its peak memory. Spans should not be nested."""
+        if not self.enabled:
+            yield
+            return
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] - base
+            self.spans.append({'stage': name, 'seconds': seconds, 'peak_bytes': max(peak, 0)})
+
+    def finish(self):
+        """Show the breakdown in the sidebar and export it. Call at the end of the script."""
+        if not self.enabled:
+            return
+        total = time.perf_counter() - self.started
+        self.release()
+        record = {
+            'app': self.app,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'total_seconds': total,
+            'spans': self.spans,
+        }
+        self.render(total)
+        try:
+            export(record)
+        except OSError as e:
+            st.sidebar.warning(f"Could not write profile: {e}")
+
+    def render(self, total):
+        with st.sidebar.expander("Rerun profile", expanded=False):
+            st.caption(f"Total {total * 1000:,.1f} ms")
+            st.dataframe(
+                [
+                    {
+                        'Stage': span['stage'],
+                        'ms': round(span['seconds'] * 1000, 2),
+                        'Share': f"{span['seconds'] / total:.0%}" if total else '',
+                        'Peak MB': round(span['peak_bytes'] / 1024 ** 2, 2),
+                    }
+                    for span in self.spans
+                ],
+                hide_index=True
+            )
+
+def export(record, output_dir=None):
+    """Append one rerun to the JSONL log and rewrite the Prometheus textfile"""
+    output_dir = Path(output_dir or OUTPUT_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with _lock:
+        log = output_dir / 'reruns.jsonl'
+        if log.exists() and log.stat().st_size > MAX_LOG_BYTES:
+            os.replace(log, log.with_name('reruns.jsonl.1'))
+        with open(log, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+        stages = [('total', record['total_seconds'], None)]
+        stages += [(s['stage'], s['seconds'], s['peak_bytes']) for s in record['spans']]
+        for stage, seconds, peak in stages:
+            hist = _histograms.setdefault((record['app'], stage), {
+                'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0, 'peak_bytes': None
+            })
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    hist['buckets'][i] += 1
+            hist['sum'] += seconds
+            hist['count'] += 1
+            hist['peak_bytes'] = peak
+
+        write_textfile(output_dir / f'dashboard_profile_{os.getpid()}.prom')
+
+def write_textfile(path):
+    """Prometheus text exposition of the collected histograms (atomic replace)"""
+    lines = [
+        '# HELP dashboard_stage_seconds Duration of a dashboard rerun stage.',
+        '# TYPE dashboard_stage_seconds histogram',
+    ]
+    for (app, stage), hist in sorted(_histograms.items()):
+        labels = f'app="{app}",stage="{stage}",pid="{os.getpid()}"'
+        for bound, count in zip(BUCKETS, hist['buckets']):
+            lines.append(f'dashboard_stage_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'dashboard_stage_seconds_bucket{{{labels},le="+Inf"}} {hist["count"]}')
+        lines.append(f'dashboard_stage_seconds_sum{{{labels}}} {hist["sum"]}')
+        lines.append(f'dashboard_stage_seconds_count{{{labels}}} {hist["count"]}')
+
+    lines += [
+        '# HELP dashboard_stage_peak_bytes Peak traced memory of the last run of a stage.',
+        '# TYPE dashboard_stage_peak_bytes gauge',
+    ]
+    for (app, stage), hist in sorted(_histograms.items()):
+        if hist['peak_bytes'] is not None:
+            lines.append(f'dashboard_stage_peak_bytes{{app="{app}",stage="{stage}",pid="{os.getpid()}"}} {hist["peak_bytes"]}')
+
+    tmp = path.with_suffix('.prom.tmp')
+    tmp.write_text('\n'.join(lines) + '\n')
+    os.replace(tmp, path)
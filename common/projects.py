@@ -0,0 +1,86 @@
+"""
+Load the dashboards' modules side by side in one process.
+
+Every project is a flat folder of scripts that import each other by bare
+name (read_data, charts, kpis), and those names collide between projects.
+A Project imports its folder's modules as '<folder>.<name>' instead: their
+globals get a private __import__ that resolves the folder's module names
+to those copies and passes every other import through. A module is
+executed on its first import only, so a page pays for its project's
+imports the first time anyone visits it and never again.
+"""
+import os
+import sys
+import builtins
+import threading
+import importlib.util
+from pathlib import Path
+from types import ModuleType
+
+# Every Project of the process by folder, see project()
+_projects = {}
+_projects_lock = threading.Lock()
+
+class Project:
+    """The modules of one dashboard folder and its entry script"""
+
+    def __init__(self, path, entry):
+        self.path = Path(path).resolve()
+        self.name = self.path.name
+        self.entry = self.path / entry
+        self.modules = {file.stem for file in self.path.glob('*.py')}
+        self.builtins = {**vars(builtins), '__import__': self._import}
+        self.ready = set()
+        # Reentrant: a module being imported imports the others
+        self.lock = threading.RLock()
+        self.code = None
+        self.code_version = None
+
+        # The folder as a package, so '<folder>.<name>' modules are well-formed
+        package = ModuleType(self.name)
+        package.__path__ = [str(self.path)]
+        sys.modules.setdefault(self.name, package)
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level == 0 and name in self.modules:
+            return self.module(name)
+        return builtins.__import__(name, globals, locals, fromlist, level)
+
+    def module(self, name):
+        """The project's module `name`, imported on first use"""
+        qualified = f'{self.name}.{name}'
+        if qualified in self.ready:
+            return sys.modules[qualified]
+        with self.lock:
+            # Finished by another thread meanwhile, or partly initialised
+            # further up this thread's imports (a circular import)
+            if qualified in sys.modules:
+                return sys.modules[qualified]
+            spec = importlib.util.spec_from_file_location(qualified, self.path / f'{name}.py')
+            module = importlib.util.module_from_spec(spec)
+            module.__builtins__ = self.builtins
+            sys.modules[qualified] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                del sys.modules[qualified]
+                raise
+            self.ready.add(qualified)
+            return module
+
+    def run(self):
+        """Run the entry script like `streamlit run` would, with the project's imports"""
+        version = os.stat(self.entry).st_mtime_ns
+        if version != self.code_version:
+            # Compiled again only when the script is edited
+            self.code = compile(self.entry.read_text(encoding='utf-8'), str(self.entry), 'exec')
+            self.code_version = version
+        exec(self.code, {'__name__': '__main__', '__file__': str(self.entry), '__builtins__': self.builtins})
+
+def project(path, entry):
+    """The process' Project for the folder at path, created on first use"""
+    path = Path(path).resolve()
+    with _projects_lock:
+        if path not in _projects:
+            _projects[path] = Project(path, entry)
+        return _projects[path]
@@ -0,0 +1,171 @@
+"""
+Stale-while-revalidate loading of a dashboard data file.
+
+A DataSource serves one Snapshot of its file: the parsed frame, its
+(mtime_ns, size) version and every value derived from it (indexes,
+aggregates). Only the very first load runs on the request path. After that
+a daemon thread checks the file every DASHBOARD_REFRESH_SECONDS; when it
+changed, the thread parses it, rebuilds every derived value the served
+snapshot holds, and swaps the new snapshot in with a single assignment.
+Sessions keep getting the previous snapshot in the meantime, so no rerun
+waits for a reload.
+
+A derived value is registered by its builder and inputs, e.g.
+derived(ScoreCube) builds ScoreCube(frame) and derived(TrendFits, ScoreCube)
+builds TrendFits from the same snapshot's ScoreCube. FRAME and VERSION
+stand for the snapshot's frame and version.
+
+DASHBOARD_REFRESH_SECONDS=0 turns the thread off; a changed file is then
+reloaded by the first request that sees it, derived values on demand.
+
+data_source() keeps one DataSource per file for the whole process, so the
+pages of the multipage app and a re-imported module share the loaded data.
+"""
+import os
+import sys
+import time
+import threading
+import traceback
+from datetime import datetime
+from pathlib import Path
+
+POLL_SECONDS = float(os.environ.get('DASHBOARD_REFRESH_SECONDS', 5))
+
+# Every DataSource of the process by file, see data_source()
+_sources = {}
+_sources_lock = threading.Lock()
+
+# Inputs of a derived value that are the snapshot's own data
+FRAME = 'frame'
+VERSION = 'version'
+
+class Snapshot:
+    """One version of the data and the values derived from it"""
+
+    def __init__(self, frame, version):
+        self.frame = frame
+        self.version = version
+        self.derived = {}
+        # Reentrant: a value is built after the values it is derived from
+        self.lock = threading.RLock()
+
+    @property
+    def as_of(self):
+        """Modification time of the file this snapshot was read from"""
+        return datetime.fromtimestamp(self.version[0] / 1e9)
+
+    def get(self, build, inputs=(FRAME,)):
+        """build(*inputs), computed once per snapshot"""
+        with self.lock:
+            key = (build, inputs)
+            if key not in self.derived:
+                self.derived[key] = build(*(self._input(value) for value in inputs))
+            return self.derived[key]
+
+    def _input(self, value):
+        if value == FRAME:
+            return self.frame
+        if value == VERSION:
+            return self.version
+        # Another derived value, built from the frame
+        return self.get(value)
+
+class DataSource:
+    """
+    The served snapshot of one data file.
+
+    load() parses the file into a frame and file_version(path) returns its
+    (mtime_ns, size).
+    """
+
+    def __init__(self, path, load, file_version, interval=POLL_SECONDS):
+        self.path = path
+        self.load = load
+        self.file_version = file_version
+        self.interval = interval
+        self.snapshot = None
+        self.refreshing = False
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def _build(self, previous=None):
+        # Versioned before parsing: a change during the load triggers another
+        version = self.file_version(self.path)
+        snapshot = Snapshot(self.load(), version)
+        if previous is not None:
+            # Everything sessions used from the old data is ready before the swap
+            for build, inputs in list(previous.derived):
+                snapshot.get(build, inputs)
+        return snapshot
+
+    def current(self):
+        """The snapshot to serve, loading the first one in the calling thread"""
+        snapshot = self.snapshot
+        if snapshot is not None and self.interval > 0:
+            return snapshot
+        with self.lock:
+            if self.snapshot is None:
+                self.snapshot = self._build()
+                self._start()
+            elif self.interval <= 0 and self.file_version(self.path) != self.snapshot.version:
+                self.snapshot = self._build()
+            return self.snapshot
+
+    def derived(self, build, *inputs):
+        """
+        build(*inputs) for the served snapshot, computed once per snapshot.
+
+        inputs default to the frame; each is FRAME, VERSION or the builder of
+        another derived value of the same snapshot.
+        """
+        return self.current().get(build, inputs or (FRAME,))
+
+    def _start(self):
+        if self.interval > 0 and self.thread is None:
+            self.thread = threading.Thread(target=self._watch, name=f"refresh {self.path.name}", daemon=True)
+            self.thread.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            self.refresh()
+
+    def refresh(self):
+        """Load the file if it changed and swap the new snapshot in"""
+        try:
+            version = self.file_version(self.path)
+        except OSError:
+            # Being replaced right now, try again on the next check
+            return
+        previous = self.snapshot
+        if version == previous.version:
+            return
+        self.refreshing = True
+        try:
+            self.snapshot = self._build(previous)
+        except Exception:
+            # Keep serving the old data, the next check retries
+            sys.stderr.write(f"Refreshing {self.path.name} failed, serving the previous data\n")
+            traceback.print_exc()
+        finally:
+            self.refreshing = False
+
+    def caption(self):
+        """'Data as of ...' line for the dashboards"""
+        text = f"Data as of {self.current().as_of:%Y-%m-%d %H:%M:%S}"
+        if self.refreshing:
+            text += " · loading newer data…"
+        return text
+
+def data_source(path, load, file_version, interval=POLL_SECONDS):
+    """The process' DataSource for the file at path, created on first use"""
+    key = Path(path).resolve()
+    with _sources_lock:
+        if key not in _sources:
+            _sources[key] = DataSource(path, load, file_version, interval)
+        return _sources[key]
+
+def data_sources():
+    """Every registered DataSource, loaded or not"""
+    with _sources_lock:
+        return list(_sources.values())
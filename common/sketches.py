@@ -0,0 +1,160 @@
+"""
+Mergeable streaming sketches for value distributions.
+
+KllSketch estimates quantiles in bounded memory: values enter the bottom
+level, and a level over capacity is sorted and every other item (random
+offset) is promoted to the level above with twice the weight. Two sketches
+merge level by level. While nothing has been compacted the sketch holds
+every value and its quantiles are exact.
+
+Error bound: the rank of a returned quantile is within about 1.7% of n of
+the requested rank with 99% confidence at k=200 (the published KLL bound,
+roughly 1.65 / k ** 0.93 * 100 %). Memory stays around 3 * k values
+whatever n is. Minimum and maximum are tracked exactly.
+
+FixedHistogram counts values in fixed-width bins anchored at zero, so
+histograms built from different files add up bin by bin. Re-binned into
+wider display bars, a value can only land in the neighbouring bar if it is
+within one bin width of the bar's edge.
+"""
+import numpy as np
+
+DEFAULT_K = 200
+# Capacity shrinks by this factor for every level below the top one
+CAPACITY_DECAY = 2 / 3
+
+class KllSketch:
+
+    def __init__(self, k=DEFAULT_K, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * CAPACITY_DECAY ** depth)), 2)
+
+    def _compress(self):
+        while True:
+            over = [h for h, items in enumerate(self.levels) if len(items) > self._capacity(h)]
+            if not over:
+                return
+            h = over[0]
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[h])
+            # An odd item out stays behind at this level
+            keep = items[len(items) - len(items) % 2:]
+            items = items[:len(items) - len(items) % 2]
+            promoted = items[self.rng.integers(2)::2]
+            self.levels[h] = keep
+            self.levels[h + 1] = np.concatenate((self.levels[h + 1], promoted))
+
+    def update(self, values):
+        """Add an array of values, NaNs are ignored"""
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+
+    def merge(self, other):
+        """Fold another sketch into this one"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate((self.levels[h], items))
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def is_exact(self):
+        return all(len(items) == 0 for items in self.levels[1:])
+
+    def items(self):
+        """Retained values, sorted, with their weights"""
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** h) for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], weights[order]
+
+    def quantiles(self, qs):
+        """Estimated quantiles, linearly interpolated (like numpy) while exact"""
+        qs = np.asarray(qs, dtype='float64')
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        if self.is_exact():
+            return np.quantile(self.levels[0], qs)
+        values, weights = self.items()
+        ranks = np.cumsum(weights)
+        picked = values[np.minimum(np.searchsorted(ranks, qs * ranks[-1], side='left'), len(values) - 1)]
+        # The extremes are known exactly
+        return np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, picked))
+
+    def to_arrays(self):
+        return {
+            'items': np.concatenate(self.levels),
+            'level_sizes': np.array([len(items) for items in self.levels]),
+            'stats': np.array([self.k, self.n, self.min, self.max], dtype='float64'),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        k, n, low, high = arrays['stats']
+        sketch = cls(int(k))
+        bounds = np.cumsum(arrays['level_sizes'])[:-1]
+        sketch.levels = np.split(arrays['items'], bounds)
+        sketch.n, sketch.min, sketch.max = int(n), low, high
+        return sketch
+
+class FixedHistogram:
+    """Counts per bin [i * width, (i + 1) * width), kept sparse"""
+
+    def __init__(self, width):
+        self.width = width
+        self.bins = np.empty(0, dtype='int64')
+        self.counts = np.empty(0, dtype='int64')
+
+    def _add(self, bins, counts):
+        bins, inverse = np.unique(np.concatenate((self.bins, bins)), return_inverse=True)
+        self.counts = np.bincount(inverse, weights=np.concatenate((self.counts, counts))).astype('int64')
+        self.bins = bins
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        bins, counts = np.unique(np.floor(values / self.width).astype('int64'), return_counts=True)
+        self._add(bins, counts)
+
+    def merge(self, other):
+        self._add(other.bins, other.counts)
+        return self
+
+    def histogram(self, edges, low, high):
+        """
+        Counts re-binned into the display edges.
+
+        Each fine bin is placed by its left edge, clipped to the exact
+        [low, high] range of the data.
+        """
+        positions = np.clip(self.bins * self.width, low, high)
+        counts, _ = np.histogram(positions, bins=edges, weights=self.counts)
+        return counts.astype('int64')
+
+    def to_arrays(self):
+        return {'bins': self.bins, 'counts': self.counts, 'width': np.array([self.width])}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        histogram = cls(float(arrays['width'][0]))
+        histogram.bins, histogram.counts = arrays['bins'], arrays['counts']
+        return histogram
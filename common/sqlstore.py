@@ -0,0 +1,117 @@
+"""
+Optional embedded SQLite backend for the dashboards.
+
+With DASHBOARD_BACKEND=sqlite a dashboard ingests its CSV into a SQLite
+file next to it and runs filters and aggregations inside the database, so
+only aggregated rows reach pandas. The database is rebuilt whenever the
+CSV's mtime or size changes, or the table's columns or indexes change;
+readers keep using the previous file until the new one has been swapped
+in.
+"""
+import os
+import json
+import sqlite3
+import threading
+import pandas as pd
+from contextlib import closing
+from pathlib import Path
+
+BACKEND = os.environ.get('DASHBOARD_BACKEND', 'pandas').lower()
+# Rows parsed and inserted per chunk while ingesting
+CHUNK_ROWS = 100_000
+
+def sql_backend_enabled():
+    return BACKEND == 'sqlite'
+
+def placeholders(values):
+    """'?, ?, ?' for an IN (...) list of values"""
+    return ', '.join('?' * len(values))
+
+class SqlStore:
+    """
+    One CSV mirrored into one table of a SQLite file.
+
+    read_chunks(path, chunksize) must yield prepared DataFrames whose columns
+    are the keys of `columns` (name -> SQL type). `indexes` is a list of
+    column tuples to index once all rows are in.
+    """
+
+    def __init__(self, csv_path, table, columns, read_chunks, indexes=()):
+        self.csv_path = Path(csv_path)
+        self.path = self.csv_path.with_suffix('.sqlite')
+        self.table = table
+        self.columns = columns
+        self.read_chunks = read_chunks
+        self.indexes = indexes
+        # Stored with the data, a database built with another layout is rebuilt
+        self.schema = json.dumps([table, columns, [list(cols) for cols in indexes]])
+        self.version = None
+        self.lock = threading.Lock()
+
+    def _source_version(self):
+        stat = self.csv_path.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _stored_version(self):
+        if not self.path.exists():
+            return None
+        with closing(sqlite3.connect(self.path)) as conn:
+            try:
+                row = conn.execute('SELECT mtime_ns, size, schema FROM source').fetchone()
+            except sqlite3.DatabaseError:
+                return None
+        if not row or row[2] != self.schema:
+            return None
+        return tuple(row[:2])
+
+    def _ingest(self, version):
+        # Built under a temporary name and swapped in, so readers never see a partial table
+        tmp = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        tmp.unlink(missing_ok=True)
+        with closing(sqlite3.connect(tmp)) as conn:
+            conn.execute('PRAGMA journal_mode = OFF')
+            conn.execute('PRAGMA synchronous = OFF')
+            columns = ', '.join(f'"{name}" {sql_type}' for name, sql_type in self.columns.items())
+            conn.execute(f'CREATE TABLE {self.table} ({columns})')
+            insert = (
+                f'INSERT INTO {self.table} VALUES ({placeholders(self.columns)})'
+            )
+            for chunk in self.read_chunks(self.csv_path, CHUNK_ROWS):
+                chunk = chunk[list(self.columns)].astype(object)
+                conn.executemany(insert, chunk.where(chunk.notna(), None).itertuples(index=False))
+            for cols in self.indexes:
+                name = f"{self.table}_{'_'.join(cols)}"
+                conn.execute(f'CREATE INDEX {name} ON {self.table} ({", ".join(cols)})')
+            conn.execute('CREATE TABLE source (mtime_ns INTEGER, size INTEGER, schema TEXT)')
+            conn.execute('INSERT INTO source VALUES (?, ?, ?)', (*version, self.schema))
+            conn.execute('ANALYZE')
+            conn.commit()
+        os.replace(tmp, self.path)
+
+    def ensure(self):
+        """Bring the database up to date with the CSV and return the data version"""
+        version = self._source_version()
+        with self.lock:
+            if self.version != version:
+                if self._stored_version() != version:
+                    self._ingest(version)
+                self.version = version
+            return self.version
+
+    def query(self, sql, params=()):
+        """Run a read-only query against the current database as a DataFrame"""
+        self.ensure()
+        with closing(sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)) as conn:
+            return pd.read_sql_query(sql, conn, params=list(params))
+
+    def scalar(self, sql, params=()):
+        """First column of the first row of a query"""
+        self.ensure()
+        with closing(sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)) as conn:
+            row = conn.execute(sql, list(params)).fetchone()
+        return row[0] if row else None
+
+    def size(self):
+        """Bytes used by the database file"""
+        self.ensure()
+        return self.path.stat().st_size
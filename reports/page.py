@@ -0,0 +1,76 @@
+"""
+Self-contained HTML pages built from KPIs, tables and Plotly figures.
+"""
+import re
+import html
+
+STYLE = """
+body { font-family: sans-serif; margin: 2rem auto; max-width: 1200px; color: #1f2937; }
+h1 { border-bottom: 2px solid #4a76a8; padding-bottom: 0.5rem; }
+h2, h3 { color: #4a76a8; }
+.metrics { display: flex; gap: 1rem; flex-wrap: wrap; }
+.metric { flex: 1; min-width: 10rem; padding: 1rem; border-radius: 0.5rem; background: #f3f4f6; }
+.metric .label { font-weight: 600; }
+.metric .value { color: #4a76a8; font-size: 2rem; font-weight: 700; }
+table { border-collapse: collapse; }
+th, td { padding: 0.25rem 0.75rem; border-bottom: 1px solid #e5e7eb; text-align: right; }
+th:first-child, td:first-child { text-align: left; }
+.caption { color: #6b7280; font-size: 0.85rem; }
+"""
+
+def slugify(text):
+    """File-name friendly form of a department or country set"""
+    return re.sub(r'[^a-z0-9]+', '-', str(text).lower()).strip('-')
+
+class Page:
+    """
+    An HTML report assembled section by section.
+
+    plotly.js is embedded once, with the first figure, so the file opens
+    offline. Pass plotlyjs='cdn' to link it instead and keep files small.
+    """
+
+    def __init__(self, title, subtitle='', plotlyjs=True):
+        self.title = title
+        self.parts = [f'<h1>{html.escape(title)}</h1>']
+        if subtitle:
+            self.parts.append(f'<h3>{html.escape(subtitle)}</h3>')
+        self.plotlyjs = plotlyjs
+
+    def heading(self, text):
+        self.parts.append(f'<h2>{html.escape(text)}</h2>')
+
+    def caption(self, text):
+        self.parts.append(f'<p class="caption">{html.escape(text)}</p>')
+
+    def metrics(self, pairs):
+        """A row of (label, value) KPI cards"""
+        cards = ''.join(
+            f'<div class="metric"><div class="label">{html.escape(str(label))}</div>'
+            f'<div class="value">{html.escape(str(value))}</div></div>'
+            for label, value in pairs
+        )
+        self.parts.append(f'<div class="metrics">{cards}</div>')
+
+    def links(self, items):
+        """Bulleted list of (href, text) links"""
+        rows = ''.join(
+            f'<li><a href="{html.escape(href)}">{html.escape(text)}</a></li>' for href, text in items
+        )
+        self.parts.append(f'<ul>{rows}</ul>')
+
+    def table(self, df, float_format='{:,.1f}'.format):
+        self.parts.append(df.to_html(index=False, float_format=float_format, border=0, na_rep=''))
+
+    def figure(self, fig):
+        self.parts.append(fig.to_html(full_html=False, include_plotlyjs=self.plotlyjs))
+        # Later figures reuse the library loaded by the first one
+        self.plotlyjs = False
+
+    def render(self):
+        body = '\n'.join(self.parts)
+        return (
+            '<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+            f'<title>{html.escape(self.title)}</title><style>{STYLE}</style></head>'
+            f'<body>\n{body}\n</body></html>\n'
+        )
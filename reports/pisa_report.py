@@ -0,0 +1,63 @@
+"""
+PISA score reports, one per country set.
+
+Imported inside a worker whose sys.path starts with 1_pisa_scores, see
+render.py.
+"""
+from filter_index import get_filter_index
+from labels import country_codes, indicator_names
+from charts import scores_by_location_figure, score_trends_figures, score_distribution_figure
+from page import Page, slugify
+
+def report_names(country_sets=None):
+    """The requested country sets, or the dashboard's default selection"""
+    if country_sets:
+        return [tuple(countries) for countries in country_sets]
+    return [tuple(get_filter_index().options('location')[:5])]
+
+def rankings_table(countries):
+    """Latest score and OECD-wide rank of each country, per subject area"""
+    # kpis reads the data at import, only load it in the workers that need it
+    from kpis import get_rankings
+    ranks = get_rankings('TOT')
+    ranks = ranks[ranks['location'].isin(countries)]
+    latest = ranks.groupby('indicator')['time_period'].transform('max')
+    ranks = ranks[ranks['time_period'] == latest].sort_values(['indicator', 'rank'])
+    return ranks.assign(
+        location=ranks['location'].map(lambda code: country_codes.get(code, code)),
+        indicator=ranks['indicator'].map(lambda code: indicator_names.get(code, code))
+    ).rename(columns={
+        'location': 'Country', 'indicator': 'Subject Area', 'time_period': 'Year',
+        'value': 'PISA Score', 'rank': 'Rank'
+    })
+
+def render(countries, plotlyjs=True):
+    """(file name, title, html) of the report for one country set"""
+    index = get_filter_index()
+    countries = list(countries)
+    # Same defaults as the dashboard sidebar: all subjects and years, all students
+    filtered = index.filter(location=countries, subject=['TOT'])
+    names = ', '.join(country_codes.get(code, code) for code in countries)
+
+    page = Page("PISA Scores Report", names, plotlyjs)
+    page.heading("Basic Statistics")
+    page.metrics([
+        ("Total Records", len(index)),
+        ("Locations", len(index.options('location'))),
+        ("Subjects", len(index.options('indicator'))),
+        ("Time Periods", len(index.options('time_period'))),
+    ])
+
+    page.heading("Latest Scores and OECD Rank")
+    page.table(rankings_table(countries))
+
+    page.heading("Average PISA Scores by Country")
+    page.figure(scores_by_location_figure(filtered, country_codes))
+
+    page.heading("PISA Score Trends Over Time")
+    for _, fig in score_trends_figures(filtered, country_codes):
+        page.figure(fig)
+
+    page.heading("Score Distribution")
+    page.figure(score_distribution_figure(filtered))
+    return f"pisa_scores_{slugify('-'.join(countries))}.html", page.title + ": " + names, page.render()
@@ -0,0 +1,103 @@
+"""
+Render the dashboards as static, self-contained HTML reports.
+
+Use: python reports/render.py --out build/reports
+     python reports/render.py --projects 1_pisa_scores --countries FIN,SWE,NOR --countries USA,CAN
+     python reports/render.py --cdn
+
+Writes the executive report for the company and for every department, one
+PISA report per country set (the dashboard's default selection if none is
+given) and an index.html linking them all. Pass --cdn to link plotly.js
+instead of embedding it in every file.
+
+The KPI and chart functions of the dashboards are called directly, without
+a Streamlit server. Reports are rendered by one process pool per project:
+the projects' modules share names (read_data, charts, kpis), so a worker
+only ever imports the modules of one project.
+"""
+import os
+import sys
+import time
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from page import Page
+
+ROOT = Path(__file__).resolve().parent.parent
+REPORTS = {
+    '0_supahcoolsoft': 'supahcoolsoft_report',
+    '1_pisa_scores': 'pisa_report',
+}
+
+def enter_project(project):
+    """Pool initializer: make the modules of one project importable"""
+    sys.path.insert(1, str(ROOT / project))
+
+def list_reports(project, *options):
+    return importlib.import_module(REPORTS[project]).report_names(*options)
+
+def render_report(project, name, out, plotlyjs):
+    """Render one report into out, return (file name, title, seconds)"""
+    start = time.perf_counter()
+    filename, title, text = importlib.import_module(REPORTS[project]).render(name, plotlyjs)
+    path = Path(out) / filename
+    # Written under a temporary name, a web server never serves half a file
+    tmp = path.with_name(f'.{filename}.tmp')
+    tmp.write_text(text, encoding='utf-8')
+    os.replace(tmp, path)
+    return filename, title, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', default='build/reports')
+    parser.add_argument('--projects', nargs='+', default=list(REPORTS), choices=list(REPORTS))
+    parser.add_argument('--countries', action='append', metavar='CODES',
+                        help="comma-separated country codes, once per report")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes, split between the projects")
+    parser.add_argument('--cdn', action='store_true', help="link plotly.js instead of embedding it")
+    args = parser.parse_args()
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    plotlyjs = 'cdn' if args.cdn else True
+    options = {
+        '0_supahcoolsoft': (),
+        '1_pisa_scores': ([codes.split(',') for codes in args.countries or []],),
+    }
+    per_project = max(args.workers // len(args.projects), 1)
+    pools = {
+        project: ProcessPoolExecutor(per_project, initializer=enter_project, initargs=(project,))
+        for project in args.projects
+    }
+
+    start = time.perf_counter()
+    try:
+        names = {
+            project: pools[project].submit(list_reports, project, *options[project])
+            for project in args.projects
+        }
+        futures = [
+            pools[project].submit(render_report, project, name, str(out), plotlyjs)
+            for project in args.projects
+            for name in names[project].result()
+        ]
+        written = []
+        for future in as_completed(futures):
+            filename, title, seconds = future.result()
+            written.append((filename, title))
+            print(f"{filename:<60} {seconds:6.2f}s")
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
+
+    index = Page("Dashboard Reports")
+    index.links(sorted(written))
+    index.caption(f"{len(written)} reports rendered in {time.perf_counter() - start:.1f}s")
+    (out / 'index.html').write_text(index.render(), encoding='utf-8')
+    print(f"\n{len(written)} reports in {out}, rendered in {time.perf_counter() - start:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Executive dashboard reports: one for the company and one per department.
+
+Imported inside a worker whose sys.path starts with 0_supahcoolsoft, see
+render.py.
+"""
+import pandas as pd
+from read_data import read_data
+from aggregates import get_aggregates, compute_aggregates
+from kpis import company_kpis, department_kpis
+from employee_table import DISPLAY_COLUMNS
+from charts import employees_by_department_figure, histogram_figure, boxplot_figure
+from page import Page, slugify
+
+# Employees listed in a department report, the highest paid first. The
+# dashboard pages through the full roster, a static file would carry all of it.
+TABLE_ROWS = 50
+
+def report_names():
+    """'company' plus every department with employees"""
+    departments = read_data()['Department'].dropna().unique()
+    return ['company'] + sorted(str(dept) for dept in departments)
+
+def distribution_sections(page, aggregates):
+    page.heading("Salary Analysis")
+    page.figure(histogram_figure(*aggregates['salary_hist'], "Salary distribution", "Salary (SEK)"))
+    page.figure(boxplot_figure(
+        aggregates['salary_box'], aggregates['departments'], "Salaries per department", "Salary (SEK)"
+    ))
+    page.heading("Age Analysis")
+    page.figure(histogram_figure(*aggregates['age_hist'], "Age distribution", "Age"))
+    page.figure(boxplot_figure(
+        aggregates['age_box'], aggregates['departments'], "Age per department", "Age"
+    ))
+
+def position_summary(members):
+    """Employees, average age and salary range per position of one department"""
+    grouped = members.groupby('Position', observed=True)
+    return pd.DataFrame({
+        'Employees': grouped.size(),
+        'Average Age': grouped['Age'].mean(),
+        'Average Salary': grouped['Salary_SEK'].mean(),
+        'Lowest Salary': grouped['Salary_SEK'].min(),
+        'Highest Salary': grouped['Salary_SEK'].max(),
+    }).sort_values('Employees', ascending=False, kind='stable').rename_axis('Position').reset_index()
+
+def company_report(plotlyjs):
+    page = Page("Executive Dashboard", "Supahcoolsoft Employee Overview", plotlyjs)
+    company = company_kpis()
+    page.heading("Company-wide Statistics")
+    page.metrics([
+        ("Total Employees", company['total_employees']),
+        ("Average Age", f"{company['average_age']:.1f} years"),
+        ("Average Salary", f"{company['average_salary']:,.0f} SEK"),
+    ])
+    page.table(department_kpis().rename_axis('Department').reset_index())
+
+    aggregates = get_aggregates()
+    page.heading("Department Statistics")
+    page.figure(employees_by_department_figure(aggregates))
+    distribution_sections(page, aggregates)
+    return page
+
+def department_report(department, plotlyjs):
+    page = Page(f"Executive Dashboard: {department}", "Supahcoolsoft Department Overview", plotlyjs)
+    kpis = department_kpis().loc[department]
+    page.heading("Department Statistics")
+    page.metrics([
+        ("Employees", int(kpis['employees'])),
+        ("Average Age", f"{kpis['average_age']:.1f} years"),
+        ("Average Salary", f"{kpis['average_salary']:,.0f} SEK"),
+    ])
+
+    df = read_data()
+    members = df[df['Department'] == department]
+    distribution_sections(page, compute_aggregates(members))
+
+    page.heading("Positions")
+    page.table(position_summary(members), float_format='{:,.0f}'.format)
+
+    page.heading("Highest Paid Employees")
+    top = members.nlargest(TABLE_ROWS, 'Salary_SEK', keep='first')
+    page.table(top[DISPLAY_COLUMNS], float_format='{:,.0f}'.format)
+    if len(members) > len(top):
+        page.caption(f"Top {len(top):,} of {len(members):,} employees by salary, the dashboard lists them all.")
+    return page
+
+def render(name, plotlyjs=True):
+    """(file name, title, html) of one report"""
+    if name == 'company':
+        page, filename = company_report(plotlyjs), 'executive_dashboard.html'
+    else:
+        page, filename = department_report(name, plotlyjs), f'executive_dashboard_{slugify(name)}.html'
+    return filename, page.title, page.render()
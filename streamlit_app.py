@@ -0,0 +1,49 @@
+"""
+Every dashboard as a page of one Streamlit server.
+
+Use: streamlit run streamlit_app.py
+
+A page imports its project's modules the first time anyone visits it (see
+common/projects.py), so the server starts with none of the dashboards'
+imports and data. Loaded modules and data are shared by every later
+session. Each dashboard still runs on its own as well, e.g.
+streamlit run 1_pisa_scores/dashboard.py.
+"""
+import streamlit as st
+from pathlib import Path
+from common.projects import project
+from common.refresher import data_sources
+
+ROOT = Path(__file__).resolve().parent
+
+# (folder, entry script, page title, icon)
+DASHBOARDS = [
+    ('0_supahcoolsoft', 'dashboard.py', "Executive Dashboard", "👨‍💼"),
+    ('1_pisa_scores', 'dashboard.py', "PISA Scores", "📚"),
+    ('3_ice_cream', 'app.py', "Ice Cream Revenue", "🍦"),
+]
+
+def overview():
+    """Landing page: links to the dashboards and the data this server has loaded"""
+    st.title("Dashboards")
+    for page in dashboards:
+        st.page_link(page, label=page.title, icon=page.icon)
+
+    st.markdown("## Loaded data")
+    rows = []
+    for source in data_sources():
+        snapshot = source.snapshot
+        rows.append({
+            'File': source.path.name,
+            'Rows': len(snapshot.frame) if snapshot is not None else None,
+            'As of': snapshot.as_of if snapshot is not None else None,
+        })
+    if rows:
+        st.dataframe(rows, hide_index=True)
+    st.caption("A dashboard loads its data when it is first visited, then every session shares it.")
+
+dashboards = [
+    st.Page(project(ROOT / folder, entry).run, title=title, icon=icon, url_path=folder.split('_', 1)[1])
+    for folder, entry, title, icon in DASHBOARDS
+]
+st.navigation([st.Page(overview, title="Overview", icon="🏠", default=True), *dashboards]).run()